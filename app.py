@@ -1,7 +1,17 @@
 import coral
+import enrichmentstore as es
+import logging
+import metadatastore as ms
+import os
+import papercache as pc
+import resilience
 import streamlit as st
+import telemetry
+import time
 import weaviatestore as ws
 
+from concurrent.futures import Future, ThreadPoolExecutor
+
 st.set_page_config(
     page_title="Athena - Research Companion",
     page_icon="🦉",
@@ -11,23 +21,87 @@ st.set_page_config(
         "About": "Built by @dcarpintero with Cohere and Weaviate"},
 )
 
+PAGE_DEADLINE_SECONDS = 45
+NO_CATEGORY_WARNING = "⚠️ Select at least one arXiv category (sidebar) to search."
+resilience.start_deadline(PAGE_DEADLINE_SECONDS)
+telemetry.start_page()
+telemetry.mark_startup("imports")
+
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporters():
+    telemetry.start_exporters_from_env()
+
 
 @st.cache_resource(show_spinner=False)
-def load_cohere_engine():
+def startup_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="athena-startup")
+
+
+def construct(name: str, factory):
+    """
+    Build a client in the background, recording its construction time.
+    """
+    start = time.perf_counter()
+    client = factory()
+    telemetry.observe(f"startup.{name}", time.perf_counter() - start)
+    telemetry.mark_startup(f"{name}_ready")
+    return client
+
+
+def resolve(future: Future, loader, label: str):
+    """
+    Wait for a client built in the background. A failed construction is evicted from the cache,
+    so that it is retried on the next run.
+    """
     try:
-        return coral.CohereEngine()
-    except (OSError, EnvironmentError) as e:
-        st.error(f'Cohere Engine Error {e}')
+        return future.result()
+    except Exception as e:
+        loader.clear()
+        if not isinstance(e, OSError):
+            raise
+        st.error(f'{label} Error {e}')
         st.stop()
 
 
 @st.cache_resource(show_spinner=False)
-def load_weaviate_store():
+def load_cohere_engine() -> Future:
+    return startup_executor().submit(construct, "cohere_engine", coral.CohereEngine)
+
+
+@st.cache_resource(show_spinner=False)
+def load_weaviate_store() -> Future:
+    return startup_executor().submit(construct, "weaviate_store", ws.WeaviateStore)
+
+
+@st.cache_resource(show_spinner=False)
+def load_metadata_store():
     try:
-        return ws.WeaviateStore()
-    except (OSError, EnvironmentError) as e:
-        st.error(f'Weaviate Store Error {e}')
-        st.stop()
+        return ms.MetadataStore()
+    except OSError as e:
+        logging.warning(f"Metadata index unavailable, falling back to arXiv API: {e}")
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def load_enrichment_store():
+    if not os.path.exists(es.ENRICHMENTS_DB):
+        logging.warning(f"Enrichment store '{es.ENRICHMENTS_DB}' not found, computing results on demand")
+        return None
+    return es.EnrichmentStore()
+
+
+def precomputed(metadata: dict, task: str, prompt_version: str = None):
+    """
+    Result of a task from the enrichment store, if it was precomputed (with the given prompt version).
+    """
+    return enrichment_store.get(metadata['entry_id'], task, prompt_version) if enrichment_store else None
+
+
+@st.cache_resource(show_spinner=False)
+def load_paper_prefetcher():
+    return pc.PaperPrefetcher(loader=cohere_engine.load_arxiv_paper,
+                              cache=cohere_engine.papers)
 
 
 @st.cache_data()
@@ -36,33 +110,61 @@ def load_arxiv_paper(id: str):
     return metadata, content
 
 
+def load_arxiv_metadata(id: str):
+    """
+    Resolve papers of the corpus from the local metadata index, and only fall back to arXiv for the rest.
+    """
+    metadata = metadata_store.get(id) if metadata_store else None
+    if metadata is None:
+        metadata, _ = load_arxiv_paper(id)
+    return metadata
+
+
 def search_documents(topic: str, max_results=10):
-    return weaviate_store.query_with_near_text(query=topic, max_results=max_results)
+    # Only called with at least one category selected: no category does not mean all of them.
+    # The topic is embedded once, instead of by Weaviate in every searched partition
+    query_vector = cohere_engine.embed([topic], input_type="search_query")[0]
+    return weaviate_store.query_with_near_vector(query_vector=query_vector, max_results=max_results,
+                                                 categories=tuple(categories))
 
 
 @st.cache_data()
 def summarize(metadata: dict):
+    result = precomputed(metadata, "summary")
+    if result is not None:
+        return result
     return cohere_engine.summarize(text=metadata['Summary'])
 
 
+# prompt_version keys the cached results on the prompt templates of their task, so that edited prompts take effect
+# without a restart
 @st.cache_data
-def enrich_abstract(metadata: dict):
+def enrich_abstract(metadata: dict, prompt_version: str):
+    result = precomputed(metadata, "abstract", prompt_version)
+    if result is not None:
+        return result
     return cohere_engine.enrich_abstract(text=metadata['Summary'])
 
 
 @st.cache_data()
-def extract_keywords(metadata: dict):
+def extract_keywords(metadata: dict, prompt_version: str):
+    result = precomputed(metadata, "keywords", prompt_version)
+    if result is not None:
+        return result
     return cohere_engine.extract_keywords(text=metadata['Summary'])
 
 
 @st.cache_resource()
-def generate_tweet(metadata: dict):
+def generate_tweet(metadata: dict, prompt_version: str):
+    result = precomputed(metadata, "tweet", prompt_version)
+    if result is not None:
+        return coral.Tweet(text=result)
     return cohere_engine.generate_tweet(summary=metadata['Summary'],
                                         link=metadata['entry_id'])
 
 
 @st.cache_resource()
-def generate_email(metadata: dict):
+def generate_email(metadata: dict, prompt_version: str):
     return cohere_engine.generate_email(sender="Athena",
                                         institution="Latent Univeristy",
                                         receivers=metadata['Authors'],
@@ -74,8 +176,12 @@ def query_article(article: str, query: str):
     return cohere_engine.query_article(article=article, query=query)
 
 
-cohere_engine = load_cohere_engine()
-weaviate_store = load_weaviate_store()
+start_metrics_exporters()
+# The engine and the store are built in the background while the sidebar renders
+cohere_engine_future = load_cohere_engine()
+weaviate_store_future = load_weaviate_store()
+metadata_store = load_metadata_store()
+enrichment_store = load_enrichment_store()
 
 # -----------------------------------------------------------------------------
 # Sidebar Section
@@ -98,8 +204,17 @@ with st.sidebar.expander("🤖 COHERE-SETTINGS", expanded=True):
                             max_value=15, value=10, step=1)
 
 with st.sidebar.expander("📁 WEAVIATE-SETTINGS", expanded=True):
-    gen_model = st.selectbox("Cluster", ["arxiv.cs.CL.large"], key="cluster",
-                             index=0, help="Data collection of 50K arXiv articles in NLP and ML.")
+    categories = st.multiselect("Categories", ws.CATEGORIES, default=ws.CATEGORIES, key="categories",
+                                help="arXiv categories to search. Each category is a separate partition of the index.")
+
+with st.sidebar.expander("🩺 HEALTH", expanded=False):
+    health = resilience.metrics()
+    for name, breaker in health["breakers"].items():
+        icon = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}[breaker["state"]]
+        st.caption(f"{icon} {name}: {breaker['state']} (opened {breaker['opened_total']}x)")
+    st.json(health["calls"], expanded=False)
+    show_timing = st.checkbox("Show timing breakdown", value=False,
+                              help="Lists the latency of every Cohere, Weaviate and cache call of this page")
 
 
 with st.expander("ℹ️ ABOUT-THIS-APP", expanded=False):
@@ -119,8 +234,18 @@ with st.sidebar:
     with col_we:
         "[![Weaviate](https://img.shields.io/badge/Weaviate-green)](https://weaviate.io/?ref=https://github.com/dcarpintero)"
 
+telemetry.mark_startup("sidebar")
+
+cohere_engine = resolve(cohere_engine_future, load_cohere_engine, "Cohere Engine")
+weaviate_store = resolve(weaviate_store_future, load_weaviate_store, "Weaviate Store")
+paper_prefetcher = load_paper_prefetcher()
+telemetry.mark_startup("clients")
 
-metadata, content = load_arxiv_paper(arxiv_id)
+try:
+    metadata = load_arxiv_metadata(arxiv_id)
+except (LookupError, ValueError) as e:
+    st.error(f"{e}. Please check the Article ID.")
+    st.stop()
 
 # -----------------------------------------------------------------------------
 
@@ -136,7 +261,7 @@ def main():
                                                                        "📬 EMAIL-AUTHORS",
                                                                        "📣 TWEET"])
 
-    with tab_tldr:
+    with tab_tldr, telemetry.span("tab.tldr"):
         col1, col2 = st.columns([1, 1])
 
         with col1:
@@ -146,7 +271,7 @@ def main():
                 f"ℹ️ Enriches Abstract w/ Wikipedia links combining this [Prompt Template]({lnk_template}) w/ [LCEL]({lnk_lcel}).")
             try:
                 st.subheader("Abstract w/ Wikipedia")
-                st.write(enrich_abstract(metadata).replace("Response:", "", 1))
+                st.write(enrich_abstract(metadata, cohere_engine.prompt_version("abstract")).replace("Response:", "", 1))
             except Exception as e:
                 st.error(f"enrich_abstract (ERROR): {e}")
         with col2:
@@ -156,85 +281,107 @@ def main():
                 f"ℹ️ Composes a Glossary combining this [Prompt Template]({lnk_template}) w/ [LCEL]({lnk_lcel}).")
             try:
                 st.subheader("Glossary")
-                st.write(extract_keywords(metadata))
+                st.write(extract_keywords(metadata, cohere_engine.prompt_version("keywords")))
             except Exception as e:
                 st.error(f"extract_keywords (ERROR): {e}")
 
-    with tab_similar:
+    with tab_similar, telemetry.span("tab.similar"):
         lnk_embed = 'https://github.com/dcarpintero/athena/blob/5457229eba2c634b1bb3804aa342344b50ac278b/data_pipeline/embed_arxiv.py#L23-L45'
         lnk_index = 'https://github.com/dcarpintero/athena/blob/5457229eba2c634b1bb3804aa342344b50ac278b/data_pipeline/index_arxiv.py#L12-L116'
         lnk_ds = 'https://huggingface.co/datasets/dcarpintero/arXiv.cs.AI.CL.CV.LG.MA.NE.embedv3'
         st.info(
             f"ℹ️ Lists the most similar Articles from a self-created [embeddings]({lnk_embed}) [arXiv dataset]({lnk_ds}) of 50k entries in AI, ML and NLP [indexed with Weaviate]({lnk_index})")
         topic = f"{metadata['Title']}:{metadata['Summary']}"
-        data = search_documents(topic=topic, max_results=max_results)
-
-        col1, col2 = st.columns([1, 1])
-        with col1:
-            for idx, doc in data.iterrows():
-                if idx % 2 == 0:
-                    arxiv_id = doc["url"].split('/')[-1].split('v')[0]
-                    with st.expander(f'**{doc["title"]}**', expanded=True):
-                        st.markdown(
-                            f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
+        if not categories:
+            st.warning(NO_CATEGORY_WARNING)
+        else:
+            try:
+                data = search_documents(topic=topic, max_results=max_results)
+                # Only papers outside the metadata index are downloaded when opened (see load_arxiv_metadata)
+                paper_prefetcher.prefetch([paper_id for paper_id in (pc.split_arxiv_id(url)[0] for url in data["url"])
+                                           if metadata_store is None or metadata_store.get(paper_id) is None])
+
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    for idx, doc in data.iterrows():
+                        if idx % 2 == 0:
+                            arxiv_id = doc["url"].split('/')[-1].split('v')[0]
+                            with st.expander(f'**{doc["title"]}**', expanded=True):
+                                st.markdown(
+                                    f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
+
+                with col2:
+                    for idx, doc in data.iterrows():
+                        if idx % 2 != 0:
+                            arxiv_id = doc["url"].split('/')[-1].split('v')[0]
+                            with st.expander(f'**{doc["title"]}**', expanded=True):
+                                st.markdown(
+                                    f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
+            except Exception as e:
+                st.error(f"search_documents (ERROR): {e}")
 
-        with col2:
-            for idx, doc in data.iterrows():
-                if idx % 2 != 0:
-                    arxiv_id = doc["url"].split('/')[-1].split('v')[0]
-                    with st.expander(f'**{doc["title"]}**', expanded=True):
-                        st.markdown(
-                            f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
-
-    with tab_finder:
+    with tab_finder, telemetry.span("tab.finder"):
         st.info(
             f"ℹ️ Find articles in your research topic from a self-created arXiv dataset of 50k entries in AI, ML and NLP [Powered by Cohere's Embed-v3 and Weaviate]")
         query = st.text_input(label="Ask any Paper", placeholder='fine-tuning pre-trained language models',
                               key="user_query_txt", label_visibility="hidden")
 
-        if query:
-            data = search_documents(topic=query, max_results=max_results)
-
-            col1, col2 = st.columns([1, 1])
-            with col1:
-                for idx, doc in data.iterrows():
-                    if idx % 2 == 0:
-                        arxiv_id = doc["url"].split('/')[-1].split('v')[0]
-                        with st.expander(f'**{doc["title"]}**', expanded=True):
-                            st.markdown(
-                                f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
-
-            with col2:
-                for idx, doc in data.iterrows():
-                    if idx % 2 != 0:
-                        arxiv_id = doc["url"].split('/')[-1].split('v')[0]
-                        with st.expander(f'**{doc["title"]}**', expanded=True):
-                            st.markdown(
-                                f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
-
-    with tab_email:
+        if query and not categories:
+            st.warning(NO_CATEGORY_WARNING)
+        elif query:
+            try:
+                data = search_documents(topic=query, max_results=max_results)
+
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    for idx, doc in data.iterrows():
+                        if idx % 2 == 0:
+                            arxiv_id = doc["url"].split('/')[-1].split('v')[0]
+                            with st.expander(f'**{doc["title"]}**', expanded=True):
+                                st.markdown(
+                                    f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
+
+                with col2:
+                    for idx, doc in data.iterrows():
+                        if idx % 2 != 0:
+                            arxiv_id = doc["url"].split('/')[-1].split('v')[0]
+                            with st.expander(f'**{doc["title"]}**', expanded=True):
+                                st.markdown(
+                                    f'{doc["abstract"][:800]} [...] **[{arxiv_id}]** [PDF]({doc["url_pdf"]})')
+            except Exception as e:
+                st.error(f"search_documents (ERROR): {e}")
+
+    with tab_email, telemetry.span("tab.email"):
         lnk_lcel = 'https://github.com/dcarpintero/athena/blob/5457229eba2c634b1bb3804aa342344b50ac278b/coral.py#L100-L127'
         st.info(
             f"ℹ️ This Task uses [LCEL](https://python.langchain.com/docs/expression_language/) and [Pydantic](https://docs.pydantic.dev/latest/) to [format the generated e-mail in JSON]({lnk_lcel}).")
         try:
-            email = generate_email(metadata)
+            email = generate_email(metadata, cohere_engine.prompt_version("email"))
 
             st.subheader(email.subject)
             st.write(email.body)
         except Exception as e:
             st.error(f"generate_email (ERROR): {e}")
 
-    with tab_tweet:
+    with tab_tweet, telemetry.span("tab.tweet"):
         lnk_pydantic = 'https://github.com/dcarpintero/athena/blob/5457229eba2c634b1bb3804aa342344b50ac278b/coral.py#L17-L28'
         lnk_lcel = 'https://github.com/dcarpintero/athena/blob/5457229eba2c634b1bb3804aa342344b50ac278b/coral.py#L74-L97'
         st.info(
             f"ℹ️ This Task uses a [Pydantic class]({lnk_pydantic}) w/ [LCEL]({lnk_lcel}) to validate that the generated Tweet includes the arXiv link. Invalid responses result in an Error.")
         try:
-            tweet = generate_tweet(metadata)
+            tweet = generate_tweet(metadata, cohere_engine.prompt_version("tweet"))
             st.write(tweet.text)
         except Exception as e:
             st.error(f"generate_tweet (ERROR): {e}")
 
+    if show_timing:
+        with st.expander("⏱️ TIMING-BREAKDOWN", expanded=True):
+            st.caption("This page")
+            st.dataframe(telemetry.page_breakdown(), use_container_width=True)
+            st.caption("All sessions (latency quantiles in seconds)")
+            st.dataframe(telemetry.snapshot()["latency"], use_container_width=True)
+
 
 if __name__ == "__main__":
     main()
+    telemetry.mark_startup("first_render")
@@ -0,0 +1,190 @@
+"""
+Offline throughput benchmark of the data pipeline stages against local API stand-ins (see fakes.py).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --scale 10k
+    python -m benchmarks.bench_pipeline --scale 50k --stages embed --embed-latency 0.2 --embed-rpm 100
+
+Stages:
+- parse: retrieve_arxiv.parse_xml over pre-generated Atom feeds (no I/O)
+- retrieve: retrieve_arxiv.retrieve_batch_metadata + parse_xml + save_to_json against a fake arXiv API
+- embed: embed_arxiv.process_embeddings_and_save against a fake Cohere embed endpoint
+- index: index_arxiv.index_data against a fake Weaviate batch endpoint
+
+Each stage runs in a fresh process, so that its peak RSS is measured in isolation.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks import fakes, synthetic
+
+SCALES = {"10k": 10_000, "50k": 50_000, "500k": 500_000}
+STAGES = ["parse", "retrieve", "embed", "index"]
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_pipeline")
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _stage_parse(n: int, url: str, workdir: str, options: dict) -> float:
+    import retrieve_arxiv
+
+    elapsed = 0.0
+    all_paper_metadata = []
+    for start in range(0, n, retrieve_arxiv.MAX_RESULTS_PER_BATCH):
+        xml_data = synthetic.atom_feed(start, min(retrieve_arxiv.MAX_RESULTS_PER_BATCH, n - start))
+        t0 = time.perf_counter()
+        all_paper_metadata.extend(retrieve_arxiv.parse_xml(xml_data))
+        elapsed += time.perf_counter() - t0
+    return elapsed
+
+
+def _stage_retrieve(n: int, url: str, workdir: str, options: dict) -> float:
+    import retrieve_arxiv
+    retrieve_arxiv.BASE_URL = f"{url}/api/query?"
+
+    t0 = time.perf_counter()
+    start_index, all_paper_metadata = 0, []
+    while start_index < n:
+        batch_metadata = retrieve_arxiv.retrieve_batch_metadata(start_index, retrieve_arxiv.MAX_RESULTS_PER_BATCH)
+        entries = retrieve_arxiv.parse_xml(batch_metadata)
+        if not entries:
+            break
+        all_paper_metadata.extend(entries)
+        start_index += len(entries)
+    retrieve_arxiv.save_to_json(all_paper_metadata, os.path.join(workdir, "arxiv_cs.json"))
+    return time.perf_counter() - t0
+
+
+def _stage_embed(n: int, url: str, workdir: str, options: dict) -> float:
+    import cohere
+    import embed_arxiv
+    embed_arxiv.BATCH_PAUSE_SECONDS = options["embed_pause"]
+
+    data = synthetic.corpus(n)
+    co_client = cohere.Client(api_key="bench", api_url=url, check_api_key=False)
+
+    t0 = time.perf_counter()
+    embed_arxiv.process_embeddings_and_save(data, co_client, os.path.join(workdir, "arxiv_cs_embedv3.jsonl"))
+    return time.perf_counter() - t0
+
+
+def _stage_index(n: int, url: str, workdir: str, options: dict) -> float:
+    import index_arxiv
+    index_arxiv.ARXIV_JSON = os.path.join(workdir, "arxiv_cs_embedv3.jsonl")
+    synthetic.write_embedded_corpus(index_arxiv.ARXIV_JSON, n, options["dim"])
+
+    t0 = time.perf_counter()
+    index_arxiv.index_data("bench", url, "bench")
+    return time.perf_counter() - t0
+
+
+def _run_stage(stage: str, n: int, url: str, workdir: str, options: dict, results) -> None:
+    """Entry point of the stage process."""
+    sys.path.insert(0, PIPELINE_DIR)
+    stage_fn = globals()[f"_stage_{stage}"]
+    logging.getLogger().setLevel(logging.WARNING)
+
+    seconds = stage_fn(n, url, workdir, options)
+    results.put({"seconds": seconds, "peak_rss_mb": _peak_rss_mb()})
+
+
+def run_stage(stage: str, n: int, options: dict) -> dict:
+    """
+    Run a pipeline stage over n synthetic records against its fake API, and return its metrics.
+    """
+    if stage == "parse":
+        server = None
+    elif stage == "retrieve":
+        server = fakes.FakeArxivServer(total_results=n)
+    elif stage == "embed":
+        server = fakes.FakeCohereServer(latency=options["embed_latency"], dim=options["dim"],
+                                        requests_per_minute=options["embed_rpm"])
+    else:
+        server = fakes.FakeWeaviateServer(latency=options["weaviate_latency"])
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    with tempfile.TemporaryDirectory() as workdir:
+        if server:
+            server.__enter__()
+        try:
+            process = ctx.Process(target=_run_stage,
+                                  args=(stage, n, server.url if server else None, workdir, options, results))
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError(f"Stage '{stage}' failed with exit code {process.exitcode}")
+            metrics = results.get()
+
+            objects = None
+            if stage == "embed":
+                with open(os.path.join(workdir, "arxiv_cs_embedv3.jsonl"), encoding="utf-8") as f:
+                    records = sum(1 for _ in f)
+            elif stage == "index":
+                # cross-listed papers are imported once per category partition, so objects exceed papers
+                records, objects = n, server.objects
+            else:
+                records = n
+        finally:
+            if server:
+                server.__exit__(None, None, None)
+
+    api_calls = server.total_calls() if server else 0
+    return {
+        "stage": stage,
+        "records": records,
+        "objects": objects,
+        "seconds": round(metrics["seconds"], 3),
+        "records_per_sec": round(records / metrics["seconds"], 1) if metrics["seconds"] else None,
+        "peak_rss_mb": round(metrics["peak_rss_mb"], 1),
+        "api_calls": api_calls,
+        "api_calls_per_record": round(api_calls / records, 4) if records else None,
+        "api_calls_by_endpoint": dict(server.calls) if server else {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the data pipeline stages.")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated subset of {STAGES}")
+    parser.add_argument("--dim", type=int, default=1024, help="Embedding dimension (embed-english-v3.0: 1024)")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Fake Cohere latency per request (s)")
+    parser.add_argument("--embed-rpm", type=int, default=None, help="Fake Cohere rate limit (requests/min)")
+    parser.add_argument("--embed-pause", type=float, default=0.0,
+                        help="embed_arxiv.BATCH_PAUSE_SECONDS during the benchmark (pipeline default: 5)")
+    parser.add_argument("--weaviate-latency", type=float, default=0.0, help="Fake Weaviate latency per batch (s)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    options = {"dim": args.dim, "embed_latency": args.embed_latency, "embed_rpm": args.embed_rpm,
+               "embed_pause": args.embed_pause, "weaviate_latency": args.weaviate_latency}
+
+    n = SCALES[args.scale]
+    results = []
+    for stage in args.stages.split(","):
+        logging.info(f"Running stage '{stage}' over {n} records")
+        results.append(run_stage(stage, n, options))
+
+    print(f"\n{'stage':<10}{'records':>10}{'seconds':>10}{'records/s':>12}{'peak RSS MB':>13}{'calls/record':>14}")
+    for r in results:
+        print(f"{r['stage']:<10}{r['records']:>10}{r['seconds']:>10}{r['records_per_sec'] or 0:>12}"
+              f"{r['peak_rss_mb']:>13}{r['api_calls_per_record'] or 0:>14}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"scale": args.scale, "options": options, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
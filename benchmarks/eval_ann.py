@@ -0,0 +1,232 @@
+"""
+Recall/latency evaluation of Weaviate vector index configurations (see index_arxiv.vector_index_config).
+
+For every configuration, the embedded corpus is indexed into its own class, and the results of a near-vector
+query (sent with the raw client, without WeaviateStore's coalescing and stale-result fallback) are compared
+against the exact (brute-force) cosine top-k over the same summary embeddings. Papers without embeddings are
+left out of both. Queries are the title embeddings of a sample of the papers. Each configuration is
+evaluated at several query-time 'ef' values. Run from the repository root, with WEAVIATE_URL,
+WEAVIATE_API_KEY and COHERE_API_KEY set (e.g. in .env):
+
+    python -m benchmarks.eval_ann --data data/arXiv.cs.CL.embedv3.jsonl --configs hnsw,pq,bq --ef 64,128,256
+
+The report gives, per configuration and ef: recall@k, p50/p95 query latency, and the estimated in-memory
+size of the vector index (vectors or compressed codes, plus the HNSW graph). With --weaviate-metrics-url
+(Weaviate's Prometheus endpoint, PROMETHEUS_MONITORING_ENABLED=true), the measured heap in use after the
+import is reported as well.
+
+'--fake --synthetic 5000' runs against fakes.FakeWeaviateServer (exact search, i.e. recall 1.0), to check
+the tool itself without a cluster.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmarks import fakes, synthetic
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_pipeline")
+CONFIGS = {
+    "hnsw": {"compression": "none"},
+    "hnsw-m16": {"compression": "none", "max_connections": 16, "ef_construction": 64},
+    "pq": {"compression": "pq"},
+    "bq": {"compression": "bq"},
+}
+
+
+def write_embedded_subset(src: str, dst: str, limit: int = None) -> None:
+    """
+    Copy the (first 'limit') papers of an embedded corpus that have embeddings, i.e. the papers to both
+    import and score against. Papers without embeddings would be vectorized by Weaviate on import.
+    """
+    written = 0
+    with open(src, encoding="utf-8") as source, open(dst, "w", encoding="utf-8") as target:
+        for line in source:
+            if limit and written >= limit:
+                break
+            if json.loads(line).get("embeddings"):
+                target.write(line)
+                written += 1
+
+
+def load_embeddings(filename: str) -> (list, np.ndarray, np.ndarray):
+    """
+    Read the ids, summary and title embeddings of an embedded corpus (as written by write_embedded_subset).
+    """
+    ids, summaries, titles = [], [], []
+    with open(filename, encoding="utf-8") as file:
+        for line in file:
+            item = json.loads(line)
+            ids.append(item["id"])
+            summaries.append(item["embeddings"]["summary"])
+            titles.append(item["embeddings"]["title"])
+    return ids, np.asarray(summaries, dtype=np.float32), np.asarray(titles, dtype=np.float32)
+
+
+def query_near_vector(client, class_name: str, vector: list, k: int) -> list:
+    """
+    Urls of the k nearest papers of a class, queried with the raw client: a failed query raises.
+    """
+    response = client.query.get(class_name, ["url"]).with_near_vector({"vector": vector}).with_limit(k).do()
+    if "errors" in response:
+        raise RuntimeError(f"Weaviate query on '{class_name}' failed: {response['errors'][0]['message']}")
+    return [obj["url"] for obj in response["data"]["Get"][class_name] or []]
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k nearest corpus vectors of every query by cosine similarity.
+    """
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    similarity = queries @ corpus.T
+    top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(-similarity, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def estimate_index_mb(n: int, dim: int, options: dict) -> float:
+    """
+    Estimated in-memory size of the vector index: float32 vectors (none), PQ codes plus codebook (pq)
+    or 1 bit per dimension (bq), and the HNSW graph (2 x maxConnections 8-byte links on the base layer).
+    Garbage collection overhead is not included.
+    """
+    compression = options.get("compression", "none")
+    if compression == "pq":
+        segments = options.get("pq_segments", dim // 4)
+        vectors = n * segments + 256 * dim * 4
+    elif compression == "bq":
+        vectors = n * dim / 8
+    else:
+        vectors = n * dim * 4
+    graph = n * 2 * options.get("max_connections", 64) * 8
+    return round((vectors + graph) / 2**20, 1)
+
+
+def heap_in_use_mb(metrics_url: str):
+    if not metrics_url:
+        return None
+    with urllib.request.urlopen(metrics_url, timeout=10) as r:
+        match = re.search(r"^go_memstats_heap_inuse_bytes (\S+)$", r.read().decode("utf-8"), re.M)
+    return round(float(match.group(1)) / 2**20, 1) if match else None
+
+
+def evaluate(client, class_name: str, ids: list, queries: np.ndarray, expected: np.ndarray, k: int, ef: int) -> dict:
+    """
+    Query the class at the given ef, and compare the results against the exact top-k.
+    """
+    client.schema.update_config(class_name, {"vectorIndexConfig": {"ef": ef}})
+
+    latencies, recalls = [], []
+    for query, exact in zip(queries, expected):
+        start = time.perf_counter()
+        found = set(query_near_vector(client, class_name, query.tolist(), k))
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(found & {ids[i] for i in exact}) / k)
+
+    latencies.sort()
+    return {
+        "ef": ef,
+        f"recall@{k}": round(statistics.mean(recalls), 4),
+        "p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+        "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency evaluation of Weaviate vector index configurations.")
+    parser.add_argument("--data", help="Embedded corpus (JSONL, as written by embed_arxiv.py)")
+    parser.add_argument("--synthetic", type=int, help="Use a synthetic corpus of this size instead of --data")
+    parser.add_argument("--limit", type=int, help="Index at most this many papers")
+    parser.add_argument("--configs", default="hnsw,pq", help=f"Comma separated subset of {list(CONFIGS)}")
+    parser.add_argument("--ef", default="64,128,256", help="Comma separated query-time ef values")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--class-prefix", default="AnnEval")
+    parser.add_argument("--keep", action="store_true", help="Do not delete the evaluation classes")
+    parser.add_argument("--weaviate-metrics-url", help="Weaviate Prometheus endpoint, e.g. http://host:2112/metrics")
+    parser.add_argument("--fake", action="store_true", help="Run against a local fake Weaviate (exact search)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    sys.path.insert(0, PIPELINE_DIR)
+    import index_arxiv
+    import weaviatestore
+
+    workdir = tempfile.TemporaryDirectory()
+    if args.synthetic:
+        args.data = os.path.join(workdir.name, "synthetic_embedv3.jsonl")
+        synthetic.write_embedded_corpus(args.data, args.synthetic, index_arxiv.EMBEDDING_DIM)
+    if not args.data:
+        parser.error("one of --data or --synthetic is required")
+
+    server = None
+    if args.fake:
+        server = fakes.FakeWeaviateServer(store_objects=True).__enter__()
+        os.environ.update(WEAVIATE_URL=server.url, WEAVIATE_API_KEY="eval", COHERE_API_KEY="eval")
+
+    subset = os.path.join(workdir.name, "subset.jsonl")
+    write_embedded_subset(args.data, subset, args.limit)
+    index_arxiv.ARXIV_JSON = subset
+
+    ids, corpus, titles = load_embeddings(subset)
+    rng = random.Random(0)
+    sample = rng.sample(range(len(ids)), min(args.queries, len(ids)))
+    queries = titles[sample]
+    expected = exact_top_k(corpus, queries, args.k)
+    logging.info(f"Exact top-{args.k} of {len(sample)} queries over {len(ids)} papers computed")
+
+    store = weaviatestore.WeaviateStore()
+    env = store.vars
+    report = []
+    try:
+        for name in args.configs.split(","):
+            options = CONFIGS[name]
+            class_name = f"{args.class_prefix}_{name.replace('-', '_')}"
+            logging.info(f"Indexing {len(ids)} papers into '{class_name}' ({options})")
+
+            start = time.perf_counter()
+            index_arxiv.index_data(env["COHERE_API_KEY"], env["WEAVIATE_URL"], env["WEAVIATE_API_KEY"],
+                                   class_name=class_name, index_config=index_arxiv.vector_index_config(**options))
+            entry = {
+                "config": name,
+                "options": options,
+                "papers": len(ids),
+                "index_s": round(time.perf_counter() - start, 2),
+                "estimated_index_mb": estimate_index_mb(len(ids), corpus.shape[1], options),
+                "heap_in_use_mb": heap_in_use_mb(args.weaviate_metrics_url),
+                "results": [evaluate(store.weaviate, class_name, ids, queries, expected, args.k, int(ef))
+                            for ef in args.ef.split(",")],
+            }
+            report.append(entry)
+
+            if not args.keep:
+                store.weaviate.schema.delete_class(class_name)
+    finally:
+        if server:
+            server.__exit__(None, None, None)
+        workdir.cleanup()
+
+    print(f"\n{'config':<10}{'ef':>6}{f'recall@{args.k}':>12}{'p50 ms':>10}{'p95 ms':>10}{'index MB':>10}")
+    for entry in report:
+        for r in entry["results"]:
+            print(f"{entry['config']:<10}{r['ef']:>6}{r[f'recall@{args.k}']:>12}{r['p50_ms']:>10}"
+                  f"{r['p95_ms']:>10}{entry['estimated_index_mb']:>10}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
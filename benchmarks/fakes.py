@@ -0,0 +1,272 @@
+"""
+Local stand-ins for the arXiv, Cohere and Weaviate HTTP APIs used by the data pipeline.
+Each fake runs a threaded HTTP server on a free localhost port and counts the API calls it serves.
+"""
+import json
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import synthetic
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that counts requests per endpoint and runs in a daemon thread.
+    Use as a context manager: the server is started on enter and shut down on exit.
+    """
+    daemon_threads = True
+
+    def __init__(self, handler: type) -> None:
+        super().__init__(("127.0.0.1", 0), handler)
+        self.calls = {}
+        self._calls_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, endpoint: str) -> None:
+        with self._calls_lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def total_calls(self) -> int:
+        with self._calls_lock:
+            return sum(self.calls.values())
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def send_body(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status: int, payload) -> None:
+        self.send_body(status, json.dumps(payload).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+# -----------------------------------------------------------------------------
+# arXiv
+# -----------------------------------------------------------------------------
+
+class _ArxivHandler(_JSONHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/api/query":
+            self.send_error(404)
+            return
+
+        self.server.count("query")
+        query = parse_qs(url.query)
+        start = int(query.get("start", ["0"])[0])
+        max_results = int(query.get("max_results", ["10"])[0])
+        count = max(0, min(max_results, self.server.total_results - start))
+        self.send_body(200, synthetic.atom_feed(start, count).encode("utf-8"), "application/atom+xml")
+
+
+class FakeArxivServer(FakeServer):
+    """
+    Serves synthetic Atom feeds at /api/query for a corpus of 'total_results' papers.
+    """
+
+    def __init__(self, total_results: int) -> None:
+        super().__init__(_ArxivHandler)
+        self.total_results = total_results
+
+
+# -----------------------------------------------------------------------------
+# Cohere
+# -----------------------------------------------------------------------------
+
+class _CohereHandler(_JSONHandler):
+    def do_POST(self):
+        body = self.read_json() or {}
+        if not self.path.endswith("/embed"):
+            self.send_json(404, {"message": f"Unknown endpoint '{self.path}'"})
+            return
+
+        self.server.count("embed")
+        if not self.server.acquire():
+            self.server.count("embed_rate_limited")
+            self.send_json(429, {"message": "You are using a Trial key, which is limited to N API calls / minute."})
+            return
+
+        time.sleep(self.server.latency)
+        texts = body.get("texts", [])
+        embeddings = [self.server.vector] * len(texts)
+        self.send_json(200, {"id": "bench", "texts": texts, "embeddings": embeddings,
+                             "meta": {"api_version": {"version": "1"}}})
+
+
+class FakeCohereServer(FakeServer):
+    """
+    Serves the Cohere /v1/embed endpoint with a configurable latency, embedding dimension (all texts get the
+    same random vector) and rate limit (requests per minute, answered with HTTP 429 when exceeded).
+    """
+
+    def __init__(self, latency: float = 0.0, dim: int = 1024, requests_per_minute: int = None) -> None:
+        super().__init__(_CohereHandler)
+        self.latency = latency
+        self.vector = [round(random.uniform(-1, 1), 6) for _ in range(dim)]
+        self.requests_per_minute = requests_per_minute
+        self._window_start = time.monotonic()
+        self._window_calls = 0
+        self._rate_lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        if not self.requests_per_minute:
+            return True
+        with self._rate_lock:
+            now = time.monotonic()
+            if now - self._window_start >= 60:
+                self._window_start, self._window_calls = now, 0
+            if self._window_calls >= self.requests_per_minute:
+                return False
+            self._window_calls += 1
+            return True
+
+
+# -----------------------------------------------------------------------------
+# Weaviate
+# -----------------------------------------------------------------------------
+
+_GRAPHQL_GET = re.compile(r"\{Get\{(\w+)\((.*)\)\{(.*)\}\}\}$", re.S)
+
+
+class _WeaviateHandler(_JSONHandler):
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/v1/meta":
+            self.send_json(200, {"hostname": "http://[::]:8080", "modules": {}, "version": "1.22.5"})
+        elif path == "/v1/.well-known/openid-configuration":
+            self.send_json(404, {})
+        elif path == "/v1/nodes":
+            self.send_json(200, {"nodes": [{"name": "node1", "status": "HEALTHY", "version": "1.22.5",
+                                            "stats": {"objectCount": self.server.objects, "shardCount": 1}}]})
+        elif path.startswith("/v1/schema/"):
+            class_obj = self.server.classes.get(path.rsplit("/", 1)[-1])
+            self.send_json(200 if class_obj else 404, class_obj or {})
+        else:
+            self.send_json(200, {})
+
+    def do_POST(self):
+        body = self.read_json() or {}
+        path = urlparse(self.path).path
+        if path == "/v1/batch/objects":
+            self.server.count("batch_objects")
+            objects = body.get("objects", [])
+            time.sleep(self.server.latency)
+            with self.server.objects_lock:
+                self.server.objects += len(objects)
+                if self.server.store_objects:
+                    for obj in objects:
+                        self.server.data.setdefault(obj.get("class"), []).append(obj)
+            self.send_json(200, [{"class": obj.get("class"), "id": obj.get("id"), "result": {}} for obj in objects])
+        elif path == "/v1/schema":
+            self.server.count("schema")
+            self.server.classes[body["class"]] = body
+            self.send_json(200, body)
+        elif path == "/v1/graphql":
+            self.server.count("graphql")
+            time.sleep(self.server.latency)
+            self.send_json(200, self.server.graphql(body["query"]))
+        else:
+            self.server.count(path)
+            self.send_json(200, body)
+
+    def do_PUT(self):
+        body = self.read_json() or {}
+        path = urlparse(self.path).path
+        self.server.count(path)
+        if path.startswith("/v1/schema/"):
+            self.server.classes[path.rsplit("/", 1)[-1]] = body
+        self.send_json(200, body)
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        self.server.count(path)
+        if path.startswith("/v1/schema/"):
+            with self.server.objects_lock:
+                self.server.classes.pop(path.rsplit("/", 1)[-1], None)
+                self.server.data.pop(path.rsplit("/", 1)[-1], None)
+        self.send_body(200, b"")
+
+
+class FakeWeaviateServer(FakeServer):
+    """
+    Serves the Weaviate REST endpoints used by index_arxiv.index_data: meta, schema and /v1/batch/objects
+    (with a configurable latency per batch). Imported objects are counted and, with store_objects=True,
+    kept in memory to answer GraphQL Get queries with nearVector (exact cosine search) or bm25 (term counts).
+    """
+
+    def __init__(self, latency: float = 0.0, store_objects: bool = False) -> None:
+        super().__init__(_WeaviateHandler)
+        self.latency = latency
+        self.objects = 0
+        self.objects_lock = threading.Lock()
+        self.store_objects = store_objects
+        self.classes = {}
+        self.data = {}
+
+    def graphql(self, query: str) -> dict:
+        match = _GRAPHQL_GET.match(query.strip())
+        if not match:
+            return {"errors": [{"message": f"Unsupported query: {query[:100]}"}]}
+        class_name, arguments, fields = match.groups()
+        properties = fields.split("_additional")[0].split()
+        limit = int(re.search(r"limit: (\d+)", arguments).group(1))
+        with self.objects_lock:
+            objects = list(self.data.get(class_name, []))
+
+        vector = re.search(r"nearVector: \{vector: (\[[^\]]*\])", arguments)
+        bm25 = re.search(r'bm25:\{query: "((?:[^"\\]|\\.)*)"', arguments)
+        if vector:
+            import numpy as np
+            if not objects:
+                return {"data": {"Get": {class_name: []}}}
+            query_vector = np.asarray(json.loads(vector.group(1)), dtype=np.float32)
+            matrix = np.asarray([obj["vector"] for obj in objects], dtype=np.float32)
+            similarity = matrix @ query_vector / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector))
+            ranked = [(objects[i], {"distance": float(1 - similarity[i])}) for i in np.argsort(-similarity)[:limit]]
+        elif bm25:
+            terms = bm25.group(1).lower().split()
+            scored = []
+            for obj in objects:
+                text = " ".join(str(v) for v in obj["properties"].values()).lower()
+                score = sum(text.count(term) for term in terms)
+                if score:
+                    scored.append((obj, {"score": str(float(score))}))
+            ranked = sorted(scored, key=lambda r: -float(r[1]["score"]))[:limit]
+        else:
+            return {"errors": [{"message": "Only nearVector and bm25 searches are supported"}]}
+
+        results = []
+        for obj, additional in ranked:
+            result = {p: obj["properties"].get(p) for p in properties}
+            if "_additional" in fields:
+                result["_additional"] = additional
+            results.append(result)
+        return {"data": {"Get": {class_name: results}}}
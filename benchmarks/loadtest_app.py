@@ -0,0 +1,242 @@
+"""
+Concurrent-user load test of the Streamlit app against stubbed backends (see stubs.py).
+
+It starts 'streamlit run benchmarks/stub_app.py' and drives N simulated sessions through its websocket
+protocol, as a browser would: each session renders the paper page (header and all tabs), then runs a
+number of finder searches. Run from the repository root:
+
+    python -m benchmarks.loadtest_app --sessions 20 --searches 2 --papers 5 --cohere-latency 1.0
+
+The report gives p50/p95/p99 render time, throughput, server memory per session, and the server-side
+p95 latency of every instrumented call and tab (from the telemetry exporter).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES = ["fine-tuning pre-trained language models", "retrieval augmented generation", "vision transformers",
+           "multi-agent reinforcement learning", "neural architecture search", "instruction tuning"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class Session:
+    """
+    Headless Streamlit client: one websocket connection, i.e. one app session.
+    """
+
+    def __init__(self, port: int) -> None:
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.conn = None
+        self.widget_ids = {}
+        self.errors = []
+
+    async def connect(self) -> None:
+        self.conn = await websocket_connect(self.url, subprotocols=["streamlit"])
+
+    async def rerun(self, widgets: dict) -> float:
+        """
+        Rerun the script with the given widget values (by widget label or key), and wait until it finishes.
+
+        Returns:
+        - float: Render time in seconds
+        """
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        for name, value in widgets.items():
+            if name in self.widget_ids:
+                msg.rerun_script.widget_states.widgets.append(WidgetState(id=self.widget_ids[name], string_value=value))
+
+        start = time.perf_counter()
+        await self.conn.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            payload = await self.conn.read_message()
+            if payload is None:
+                raise ConnectionError("Websocket closed by the server")
+
+            fwd = ForwardMsg()
+            fwd.ParseFromString(payload)
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                if element.WhichOneof("type") == "text_input":
+                    widget_id = element.text_input.id
+                    self.widget_ids[element.text_input.label] = widget_id
+                    self.widget_ids[widget_id.rsplit("-", 1)[-1]] = widget_id
+                elif element.WhichOneof("type") == "exception":
+                    self.errors.append(element.exception.message)
+            elif kind == "script_finished" and fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start
+
+    def close(self) -> None:
+        if self.conn:
+            self.conn.close()
+
+
+async def simulate_session(port: int, paper_id: str, searches: int, results: dict, done: asyncio.Event) -> None:
+    session = Session(port)
+    try:
+        await session.connect()
+        await session.rerun({})
+        widgets = {"Article ID": paper_id}
+        results["page"].append(await session.rerun(widgets))
+        for _ in range(searches):
+            widgets["user_query_txt"] = random.choice(QUERIES)
+            results["search"].append(await session.rerun(widgets))
+        results["errors"].extend(session.errors)
+        await done.wait()
+    except Exception as e:
+        results["errors"].append(f"{type(e).__name__}: {e}")
+    finally:
+        session.close()
+
+
+async def run_load(port: int, sessions: int, searches: int, papers: int, ramp_up: float,
+                   id_prefix: str = "2311.") -> dict:
+    results = {"page": [], "search": [], "errors": []}
+    paper_ids = [f"{id_prefix}{i:05d}" for i in range(papers)]
+    done = asyncio.Event()
+
+    tasks = []
+    for i in range(sessions):
+        tasks.append(asyncio.ensure_future(simulate_session(port, paper_ids[i % papers], searches, results, done)))
+        await asyncio.sleep(ramp_up / sessions)
+
+    while len(results["page"]) + len(results["errors"]) < sessions or \
+            len(results["search"]) < (sessions - len(results["errors"])) * searches:
+        if all(t.done() for t in tasks):
+            break
+        await asyncio.sleep(0.05)
+    done.set()
+    await asyncio.gather(*tasks)
+    return results
+
+
+def start_server(port: int, metrics_port: int, options: dict) -> subprocess.Popen:
+    env = dict(os.environ,
+               ATHENA_METRICS_PORT=str(metrics_port),
+               ATHENA_STUB_COHERE_LATENCY=str(options["cohere_latency"]),
+               ATHENA_STUB_ARXIV_LATENCY=str(options["arxiv_latency"]),
+               ATHENA_STUB_WEAVIATE_LATENCY=str(options["weaviate_latency"]))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "benchmarks/stub_app.py",
+         "--server.headless", "true", "--server.port", str(port), "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Streamlit server did not become healthy within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test of the Streamlit app.")
+    parser.add_argument("--sessions", type=int, default=20, help="Number of concurrent sessions")
+    parser.add_argument("--searches", type=int, default=2, help="Finder searches per session")
+    parser.add_argument("--papers", type=int, default=5, help="Number of distinct papers opened by the sessions")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Seconds over which the sessions connect")
+    parser.add_argument("--cohere-latency", type=float, default=1.0)
+    parser.add_argument("--arxiv-latency", type=float, default=2.0)
+    parser.add_argument("--weaviate-latency", type=float, default=0.2)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    options = {"cohere_latency": args.cohere_latency, "arxiv_latency": args.arxiv_latency,
+               "weaviate_latency": args.weaviate_latency}
+    port, metrics_port = _free_port(), _free_port()
+    server = start_server(port, metrics_port, options)
+
+    try:
+        # Warm-up: the first script run imports the app modules and builds the cached resources
+        asyncio.run(run_load(port, sessions=1, searches=1, papers=1, ramp_up=0, id_prefix="2310."))
+        baseline_mb = _rss_mb(server.pid)
+        peak_mb = [baseline_mb]
+        sampling = threading.Event()
+
+        def sample_rss():
+            while not sampling.is_set():
+                peak_mb[0] = max(peak_mb[0], _rss_mb(server.pid))
+                time.sleep(0.1)
+
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        sampler.start()
+
+        start = time.perf_counter()
+        results = asyncio.run(run_load(port, args.sessions, args.searches, args.papers, args.ramp_up))
+        elapsed = time.perf_counter() - start
+        sampling.set()
+        sampler.join()
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics.json", timeout=5) as r:
+            server_metrics = json.load(r)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    renders = results["page"] + results["search"]
+    report = {
+        "options": {**vars(args)},
+        "renders": len(renders),
+        "errors": len(results["errors"]),
+        "error_samples": sorted(set(results["errors"]))[:5],
+        "elapsed_s": round(elapsed, 2),
+        "throughput_renders_per_s": round(len(renders) / elapsed, 2),
+        "render_s": {kind: {"p50": round(_percentile(results[kind], 0.50), 3),
+                            "p95": round(_percentile(results[kind], 0.95), 3),
+                            "p99": round(_percentile(results[kind], 0.99), 3),
+                            "mean": round(statistics.mean(results[kind]), 3) if results[kind] else 0.0}
+                     for kind in ("page", "search")},
+        "server_rss_mb": {"baseline": round(baseline_mb, 1), "peak": round(peak_mb[0], 1),
+                          "per_session": round((peak_mb[0] - baseline_mb) / args.sessions, 2)},
+        "server_p95_s": {name: stats["p95"] for name, stats in sorted(server_metrics["latency"].items())},
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
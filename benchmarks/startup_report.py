@@ -0,0 +1,117 @@
+"""
+Cold start report of the Streamlit app: where import time goes, and how long a fresh server takes
+until it has rendered its first page. Run from the repository root:
+
+    python -m benchmarks.startup_report
+    python -m benchmarks.startup_report --modules "coral, weaviatestore" --top 20
+
+The report has two parts:
+- imports: 'python -X importtime' over the modules imported by app.py, with the slowest top-level
+  packages, and which of the heavy dependencies (langchain, cohere, weaviate, ...) were loaded eagerly.
+- cold_start: a fresh 'streamlit run benchmarks/stub_app.py' server (see stubs.py) is timed until it is
+  healthy and until its first page has rendered, together with the startup phases recorded by the app
+  (telemetry.mark_startup, in seconds since the server process started).
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.loadtest_app import ROOT, Session, _free_port, start_server
+
+APP_MODULES = "coral, enrichmentstore, metadatastore, papercache, resilience, streamlit, telemetry, weaviatestore"
+HEAVY_MODULES = ["langchain", "cohere", "weaviate", "pydantic", "pandas", "tomli"]
+
+
+def import_profile(modules: str, top: int) -> dict:
+    """
+    Import the given modules in a fresh interpreter with -X importtime.
+
+    Returns:
+    - dict: Total import time, the slowest top-level packages, and the heavy modules that were imported
+    """
+    check = f"import sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modules}; {check}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+
+    packages = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            packages.append((name.strip(), int(cumulative) / 1e6))
+
+    packages.sort(key=lambda p: p[1], reverse=True)
+    return {
+        "modules": modules,
+        "import_s": round(sum(seconds for _, seconds in packages), 3),
+        "interpreter_wall_s": round(wall, 3),
+        "slowest": {name: round(seconds, 3) for name, seconds in packages[:top]},
+        "heavy_loaded": [m for m in result.stdout.strip().split(",") if m],
+    }
+
+
+def cold_start() -> dict:
+    """
+    Start a fresh stub app server, and time it until healthy and until its first page has rendered.
+    """
+    port, metrics_port = _free_port(), _free_port()
+    options = {"cohere_latency": 0.0, "arxiv_latency": 0.0, "weaviate_latency": 0.0}
+
+    async def first_render() -> None:
+        session = Session(port)
+        try:
+            await session.connect()
+            await session.rerun({})
+            if session.errors:
+                raise RuntimeError(f"First page failed: {session.errors[0]}")
+        finally:
+            session.close()
+
+    start = time.perf_counter()
+    server = start_server(port, metrics_port, options)
+    try:
+        healthy = time.perf_counter() - start
+        asyncio.run(first_render())
+        rendered = time.perf_counter() - start
+        with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics.json", timeout=5) as r:
+            server_metrics = json.load(r)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        "healthy_s": round(healthy, 3),
+        "first_render_s": round(rendered, 3),
+        "phases_s": server_metrics["startup"],
+        "client_construction_s": {name: stats["sum"] for name, stats in server_metrics["latency"].items()
+                                  if name.startswith("startup.")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start report of the Streamlit app.")
+    parser.add_argument("--modules", default=APP_MODULES, help="Comma separated modules to profile")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest packages to list")
+    parser.add_argument("--skip-server", action="store_true", help="Only profile the imports")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = {"imports": import_profile(args.modules, args.top)}
+    if not args.skip_server:
+        report["cold_start"] = cold_start()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
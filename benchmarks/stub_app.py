@@ -0,0 +1,18 @@
+"""
+Streamlit entry point that runs app.py against the stubbed backends of stubs.py (used by loadtest_app.py).
+Run from the repository root:
+
+    streamlit run benchmarks/stub_app.py
+"""
+import os
+import runpy
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import stubs  # noqa: E402
+
+stubs.install()
+runpy.run_path(os.path.join(ROOT, "app.py"), run_name="__main__")
@@ -0,0 +1,207 @@
+"""
+Stand-ins for the Cohere, arXiv and Weaviate backends, which sleep for a configurable latency instead of
+calling the services. StubCohereEngine and StubWeaviateStore subclass the real CohereEngine and WeaviateStore
+and only replace their I/O leaves (the Cohere client and LLM, the arXiv loader and the Weaviate client), so that
+the app runs the production instrumentation, single-flight, resilience, token budget, prompt and partition
+fan-out code under concurrency.
+
+Latencies (seconds, jittered by +/-50%) are read from the environment:
+- ATHENA_STUB_COHERE_LATENCY (default 1.0)
+- ATHENA_STUB_ARXIV_LATENCY (default 2.0)
+- ATHENA_STUB_WEAVIATE_LATENCY (default 0.2)
+"""
+import functools
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import chains
+import coral
+import weaviatestore
+
+from papercache import PaperCache
+
+EMBEDDING_DIM = 1024
+
+_Document = namedtuple("_Document", ["metadata", "page_content"])
+
+
+def _sleep(variable: str, default: float) -> None:
+    time.sleep(float(os.getenv(variable, default)) * random.uniform(0.5, 1.5))
+
+
+# -----------------------------------------------------------------------------
+# Cohere
+# -----------------------------------------------------------------------------
+
+def _completion(prompt: str) -> str:
+    """
+    Plausible completion of a prompt of prompts/athena.toml, in the output format of its task.
+    """
+    if "Tweet" in prompt:
+        link = re.search(r"the link is: '([^']*)'", prompt).group(1)
+        return json.dumps({"text": f"Curious about this paper? Read more: {link} #AI #NLP"})
+    if "cold email" in prompt:
+        return json.dumps({"subject": "Collaboration on your research",
+                           "body": "Dear authors,\n\nI read your paper ...\n\nBest regards"})
+
+    text = prompt.rsplit("Text:", 1)[-1] if "Text:" in prompt else prompt.rsplit("field.", 1)[-1]
+    if "keywords" in prompt:
+        return "\n".join(f"- **{word}**: ..." for word in sorted(set(text.split()))[:10])
+    return text.strip().replace("language model", "[language model](https://en.wikipedia.org/wiki/Language_model)")
+
+
+@functools.cache
+def _stub_llm():
+    """
+    Langchain LLM answering every prompt after the Cohere latency, defined on first use as langchain is.
+    """
+    from langchain.llms.base import LLM
+
+    class StubLLM(LLM):
+        @property
+        def _llm_type(self) -> str:
+            return "stub"
+
+        def _call(self, prompt: str, stop=None, run_manager=None, **kwargs) -> str:
+            _sleep("ATHENA_STUB_COHERE_LATENCY", 1.0)
+            return _completion(prompt)
+
+    return StubLLM
+
+
+class StubRetriever:
+    def get_relevant_documents(self, query: str, source_documents: list = None) -> list:
+        _sleep("ATHENA_STUB_COHERE_LATENCY", 1.0)
+        return []
+
+
+class StubChainRegistry(chains.ChainRegistry):
+    """
+    ChainRegistry compiling the real templates, with the pooled Cohere models replaced by stubs.
+    """
+
+    def model(self, name: str = chains.MODEL):
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = _stub_llm()()
+            return self._models[name]
+
+    def rag_retriever(self):
+        return StubRetriever()
+
+
+class StubCohereClient:
+    def summarize(self, text: str, **kwargs):
+        _sleep("ATHENA_STUB_COHERE_LATENCY", 1.0)
+        return SimpleNamespace(summary=f"- {text[:300]}")
+
+    def embed(self, model: str, texts: list, input_type: str):
+        _sleep("ATHENA_STUB_COHERE_LATENCY", 1.0)
+        embeddings = [[random.Random(text).uniform(-1, 1) for _ in range(EMBEDDING_DIM)] for text in texts]
+        return SimpleNamespace(embeddings=embeddings)
+
+
+class StubCohereEngine(coral.CohereEngine):
+    def __init__(self) -> None:
+        self.vars = {"COHERE_API_KEY": "stub"}
+        self.cohere = StubCohereClient()
+        self.chains = StubChainRegistry(output_models=coral._models())
+        self.papers = PaperCache(cache_dir=tempfile.mkdtemp(prefix="athena-stub-papers-"))
+
+    def _search_arxiv(self, paper_id: str) -> list:
+        _sleep("ATHENA_STUB_ARXIV_LATENCY", 2.0)
+        metadata = {
+            "entry_id": f"http://arxiv.org/abs/{paper_id}v1",
+            "Published": "2023-11-01",
+            "Title": f"Synthetic paper {paper_id}",
+            "Authors": "Ada Lovelace, Alan Turing",
+            "Summary": f"We study language model training for paper {paper_id}. " * 20,
+        }
+        return [_Document(metadata, metadata["Summary"] * 50)]
+
+
+# -----------------------------------------------------------------------------
+# Weaviate
+# -----------------------------------------------------------------------------
+
+class StubQuery:
+    """
+    Fluent Get query of a partition class, answered with synthetic papers of its category.
+    """
+
+    def __init__(self, class_name: str, properties: list) -> None:
+        self.class_name = class_name
+        self.properties = properties
+        self.limit = 10
+        self.additional = []
+        self.search = None
+
+    def with_limit(self, limit: int):
+        self.limit = limit
+        return self
+
+    def with_additional(self, properties: list):
+        self.additional = properties
+        return self
+
+    def with_near_text(self, content: dict):
+        self.search = content["concepts"]
+        return self
+
+    def with_near_vector(self, content: dict):
+        self.search = content["vector"][:8]
+        return self
+
+    def with_bm25(self, query: str, **kwargs):
+        self.search = query
+        return self
+
+    def with_hybrid(self, query: str, **kwargs):
+        self.search = query
+        return self
+
+    def do(self) -> dict:
+        _sleep("ATHENA_STUB_WEAVIATE_LATENCY", 0.2)
+        category = {weaviatestore.class_name_for(c): c for c in weaviatestore.CATEGORIES}[self.class_name]
+        rng = random.Random(f"{self.class_name} {self.search}")
+        objects = []
+        for rank in range(self.limit):
+            arxiv_id = f"23{rng.randint(1, 12):02d}.{rng.randint(0, 99999):05d}"
+            paper = {"url": f"http://arxiv.org/abs/{arxiv_id}v1", "url_pdf": f"http://arxiv.org/pdf/{arxiv_id}v1",
+                     "title": f"Similar paper {arxiv_id}", "authors": "Grace Hopper", "categories": category,
+                     "abstract": "We study language model training. " * 30,
+                     "update_date": "2023-11-01T00:00:00Z", "publication_date": "2023-11-01T00:00:00Z"}
+            scores = {"distance": 0.1 + 0.02 * rank + rng.random() * 0.01, "score": str(10.0 / (rank + 1))}
+            paper = {field: paper[field] for field in self.properties}
+            paper["_additional"] = {name: scores[name] for name in self.additional}
+            objects.append(paper)
+        return {"data": {"Get": {self.class_name: objects}}}
+
+
+class StubWeaviateClient:
+    def __init__(self) -> None:
+        self.query = SimpleNamespace(get=StubQuery)
+
+
+class StubWeaviateStore(weaviatestore.WeaviateStore):
+    def __init__(self) -> None:
+        self.vars = {}
+        self.weaviate = StubWeaviateClient()
+        self.partitions = ThreadPoolExecutor(max_workers=weaviatestore.PARTITION_WORKERS,
+                                             thread_name_prefix="weaviate-partition")
+
+
+def install() -> None:
+    """
+    Make the app construct the stubs instead of the real engine and store.
+    """
+    coral.CohereEngine = StubCohereEngine
+    weaviatestore.WeaviateStore = StubWeaviateStore
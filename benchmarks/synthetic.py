@@ -0,0 +1,74 @@
+"""
+Deterministic synthetic arXiv data: Atom feeds (as served by the arXiv API), harvested papers
+(as written by retrieve_arxiv.py) and embedded papers (as written by embed_arxiv.py).
+"""
+import json
+import random
+
+from weaviatestore import CATEGORIES
+from xml.sax.saxutils import escape
+
+VOCABULARY = ("language model transformer attention training dataset benchmark neural network learning "
+              "representation fine-tuning retrieval generation reasoning evaluation agent policy reward vision "
+              "image segmentation graph embedding optimization gradient inference robustness alignment").split()
+
+
+def paper(i: int) -> dict:
+    """
+    The i-th synthetic paper, in the format of retrieve_arxiv.parse_xml.
+    """
+    rng = random.Random(i)
+    month = 1 + i % 12
+    published = f"20{18 + i % 6}-{month:02d}-{1 + i % 28:02d}T12:00:00Z"
+    categories = rng.sample(CATEGORIES, k=rng.randint(1, 3))
+    return {
+        'id': f"http://arxiv.org/abs/{18 + i % 6}{month:02d}.{i % 100000:05d}v{1 + i % 3}",
+        'title': " ".join(rng.choices(VOCABULARY, k=rng.randint(6, 14))).capitalize(),
+        'authors': ", ".join(f"Author {rng.randint(0, 20000)}" for _ in range(rng.randint(1, 8))),
+        'categories': ", ".join(categories),
+        'summary': " ".join(rng.choices(VOCABULARY, k=rng.randint(120, 250))).capitalize() + ".",
+        'link_pdf': f"http://arxiv.org/pdf/{18 + i % 6}{month:02d}.{i % 100000:05d}v{1 + i % 3}",
+        'updated': published,
+        'published': published,
+    }
+
+
+def atom_entry(p: dict) -> str:
+    authors = "".join(f"<author><name>{escape(a)}</name></author>" for a in p['authors'].split(", "))
+    categories = "".join(f'<category term="{c}" scheme="http://arxiv.org/schemas/atom"/>'
+                         for c in p['categories'].split(", "))
+    return (f"<entry><id>{p['id']}</id><updated>{p['updated']}</updated><published>{p['published']}</published>"
+            f"<title>{escape(p['title'])}</title><summary>\n  {escape(p['summary'])}\n</summary>{authors}"
+            f'<link href="{p["id"]}" rel="alternate" type="text/html"/>'
+            f'<link title="pdf" href="{p["link_pdf"]}" rel="related" type="application/pdf"/>'
+            f"{categories}</entry>")
+
+
+def atom_feed(start: int, count: int) -> str:
+    """
+    Atom feed with the synthetic papers [start, start + count), as returned by the arXiv query API.
+    """
+    entries = "".join(atom_entry(paper(i)) for i in range(start, start + count))
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+            f"<title>ArXiv Query</title><opensearch:startIndex>{start}</opensearch:startIndex>{entries}</feed>")
+
+
+def corpus(n: int) -> list:
+    return [paper(i) for i in range(n)]
+
+
+def write_embedded_corpus(filename: str, n: int, dim: int) -> None:
+    """
+    Write n synthetic papers with title and summary embeddings to a JSONL file, as embed_arxiv.py does.
+    """
+    rng = random.Random(n)
+    with open(filename, "w", encoding="utf-8") as file:
+        for i in range(n):
+            item = paper(i)
+            item['embeddings'] = {
+                'title': [round(rng.uniform(-1, 1), 6) for _ in range(dim)],
+                'summary': [round(rng.uniform(-1, 1), 6) for _ in range(dim)],
+            }
+            json.dump(item, file)
+            file.write('\n')
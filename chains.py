@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import tomli
+
+from collections import namedtuple
+from resilience import RateLimitedClient, RateLimiter
+from tokenbudget import FinishReasonClient
+
+TEMPLATES_FILE = "prompts/athena.toml"
+WATCH_INTERVAL_SECONDS = 2.0
+MODEL = "command"
+
+# Generation settings of every LCEL task; 'output' names the Pydantic model of structured outputs
+TASKS = {
+    "abstract": {"temperature": 0.3, "max_tokens": 4096, "truncate": None},
+    "keywords": {"temperature": 0.1, "max_tokens": 4096},
+    "tweet": {"temperature": 0.3, "max_tokens": 250, "output": "Tweet"},
+    "email": {"temperature": 0.1, "max_tokens": 500, "output": "Email"},
+}
+
+# Template keys of the prompt variants of a task, e.g. [abstract] prompt_compact
+VARIANTS = {"default": "prompt", "compact": "prompt_compact"}
+
+_Compiled = namedtuple("_Compiled", ["version", "mtime", "templates", "chains", "bound", "task_versions"])
+_TaskChain = namedtuple("_TaskChain", ["prompt", "settings", "parser", "chain"])
+
+
+class ChainRegistry:
+    """
+    Compiled LCEL chains (prompt | model | parser) of the CohereEngine tasks, built once per version of the
+    prompt templates. All chains share a pooled Cohere model per model name, with their generation settings
+    bound per task. A task may define a compact prompt variant ('prompt_compact', without few-shot examples),
+    which is compiled alongside. When the templates file changes, the chains are recompiled and swapped in atomically.
+    'version' is a hash of the whole file, and 'task_version(task)' a hash of the templates (all variants) and settings
+    of a single task, so that downstream caches of a task's results only change when that task does.
+    An optional RateLimiter is acquired before every API request of the pooled models, retries included.
+    The pooled models do not retry: the @resilient calls of the CohereEngine own all retries.
+    """
+
+    def __init__(self, output_models: dict, templates_file: str = TEMPLATES_FILE, tasks: dict = TASKS,
+                 limiter: RateLimiter = None) -> None:
+        self.output_models = output_models
+        self.limiter = limiter
+        self.templates_file = templates_file
+        self.tasks = tasks
+        self._models = {}
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._compiled = None
+        self._watcher = None
+        self.reload()
+
+    @property
+    def version(self) -> str:
+        return self._compiled.version
+
+    @property
+    def templates(self) -> dict:
+        return self._compiled.templates
+
+    def task_version(self, task: str) -> str:
+        """
+        Version stamp of a task: changes only when its templates or generation settings change.
+        """
+        return self._compiled.task_versions[task]
+
+    def chain(self, task: str, variant: str = "default", max_tokens: int = None):
+        """
+        Compiled chain of a task, from the latest version of the templates.
+
+        Parameters:
+        - task (str): Task in TASKS
+        - variant (str): Prompt variant in VARIANTS
+        - max_tokens (int): Overrides the max_tokens of the task. The re-bound chain is cached per version,
+          task, variant and max_tokens, which tokenbudget.plan rounds to multiples of MAX_TOKENS_STEP (within the
+          min and max of the task's BUDGETS), so that a few chains are bound per task
+        """
+        current = self._compiled
+        compiled = current.chains[(task, variant)]
+        if max_tokens is None or max_tokens == compiled.settings["max_tokens"]:
+            return compiled.chain
+
+        key = (task, variant, max_tokens)
+        if key not in current.bound:
+            chain = compiled.prompt | self.model().bind(**{**compiled.settings, "max_tokens": max_tokens})
+            current.bound[key] = chain | compiled.parser if compiled.parser else chain
+        return current.bound[key]
+
+    def prompt(self, task: str, variant: str = "default"):
+        return self._compiled.chains[(task, variant)].prompt
+
+    def has_variant(self, task: str, variant: str) -> bool:
+        return (task, variant) in self._compiled.chains
+
+    def model(self, name: str = MODEL):
+        """
+        Pooled Cohere LLM (and thus API client) of a model. Generation settings are bound per chain.
+        """
+        with self._lock:
+            if name not in self._models:
+                from langchain.llms import Cohere
+                self._models[name] = self.__pooled(Cohere(model=name, max_retries=1))  # a single attempt
+            return self._models[name]
+
+    def rag_retriever(self):
+        """
+        Pooled Cohere RAG retriever, used to query articles.
+        """
+        with self._lock:
+            if "rag" not in self._models:
+                from langchain.chat_models import ChatCohere
+                from langchain.retrievers import CohereRagRetriever
+                self._models["rag"] = CohereRagRetriever(llm=self.__pooled(ChatCohere()))
+            return self._models["rag"]
+
+    def __pooled(self, llm):
+        """
+        Turn off the HTTP retries of the client of a langchain Cohere model, which would run within every @resilient
+        attempt, send its API requests through the rate limiter, if any, and report its finish reasons.
+        """
+        llm.client.max_retries = 0
+        if self.limiter is not None:
+            llm.client = RateLimitedClient(llm.client, self.limiter)
+        llm.client = FinishReasonClient(llm.client)
+        return llm
+
+    def reload(self) -> bool:
+        """
+        Recompile the chains if the templates file has changed since the last load.
+        An invalid file is logged and ignored once a version has been loaded, so that a bad rollout
+        does not take the app down.
+
+        Returns:
+        - bool: Whether a new version was swapped in
+        """
+        with self._reload_lock:
+            return self.__reload()
+
+    def __reload(self) -> bool:
+        mtime = None
+        try:
+            mtime = os.stat(self.templates_file).st_mtime_ns
+            if self._compiled and mtime == self._compiled.mtime:
+                return False
+            with open(self.templates_file, "rb") as f:
+                content = f.read()
+            version = hashlib.sha256(content).hexdigest()[:12]
+            if self._compiled and version == self._compiled.version:
+                self._compiled = self._compiled._replace(mtime=mtime)
+                return False
+
+            logging.info(f"compile_chains ({version}) (started)")
+            templates = tomli.loads(content.decode("utf-8"))
+            chains = {(task, variant): self.__compile(templates[task][key], settings)
+                      for task, settings in self.tasks.items()
+                      for variant, key in VARIANTS.items() if key in templates[task] or variant == "default"}
+        except (OSError, KeyError, ValueError) as e:
+            if self._compiled is None:
+                logging.error(e)
+                raise OSError("Prompt templates file not found or invalid.")
+            logging.error(f"compile_chains (ERROR, keeping version {self._compiled.version}): {e}")
+            if mtime is not None:
+                self._compiled = self._compiled._replace(mtime=mtime)  # retried on the next change only
+            return False
+
+        task_versions = {task: self.__task_version(templates[task], settings) for task, settings in self.tasks.items()}
+        self._compiled = _Compiled(version, mtime, templates, chains, {}, task_versions)
+        logging.info("compile_chains (OK)")
+        return True
+
+    def watch(self, interval: float = WATCH_INTERVAL_SECONDS) -> threading.Thread:
+        """
+        Start a daemon thread that reloads the chains when the templates file changes.
+        """
+        with self._lock:
+            if self._watcher is None:
+                def poll():
+                    while True:
+                        time.sleep(interval)
+                        self.reload()
+
+                self._watcher = threading.Thread(target=poll, name="athena-prompt-watcher", daemon=True)
+                self._watcher.start()
+            return self._watcher
+
+    @staticmethod
+    def __task_version(templates: dict, settings: dict) -> str:
+        content = json.dumps({"templates": templates, "settings": settings}, sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+
+    def __compile(self, template: str, settings: dict) -> _TaskChain:
+        from langchain.output_parsers import PydanticOutputParser
+        from langchain.prompts import PromptTemplate
+
+        settings = dict(settings)
+        output = settings.pop("output", None)
+        prompt = PromptTemplate.from_template(template)
+        parser = PydanticOutputParser(pydantic_object=self.output_models[output]) if output else None
+        chain = prompt | self.model().bind(**settings)
+        return _TaskChain(prompt, settings, parser, chain | parser if parser else chain)
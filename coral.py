@@ -1,53 +1,88 @@
-import logging, os
-import cohere
-import tomli
+"""
+Cohere engine of the app. Cohere, langchain and pydantic are only imported on first use, so that importing
+this module (and starting the app) does not pay for them; see benchmarks/startup_report.py.
+"""
+from __future__ import annotations
 
+import functools, logging, os
+import tokenbudget
+
+from chains import ChainRegistry
 from dotenv import load_dotenv
-from langchain.chat_models import ChatCohere
-from langchain.document_loaders import ArxivLoader
-from langchain.llms import Cohere
-from langchain.output_parsers import PydanticOutputParser
-from langchain.prompts import PromptTemplate
-from langchain.retrievers import CohereRagRetriever
-from langchain.schema.document import Document
-from pydantic import BaseModel, Field, field_validator
+from papercache import PaperCache
+from resilience import RateLimitedClient, RateLimiter, resilient
+from singleflight import coalesce
+from telemetry import instrument, meter_tokens, record_tokens
 from tenacity import retry, stop_after_attempt, wait_random_exponential
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pydantic is imported on first use, to keep the app's cold start short
+    from outputs import Email, Tweet
 
 
-class Tweet(BaseModel):
+@functools.cache
+def _models() -> dict:
     """
-    Pydantic Model to generate an structured Tweet with Validation
+    Pydantic models of the structured outputs (see outputs.py), imported on first use.
     """
-    text: str = Field(..., description="Tweet text")
+    import outputs
 
-    @field_validator('text')
-    def validate_text(cls, v: str) -> str:
-        if "https://" not in v and "http://" not in v:
-            logging.error("Tweet does not include a link to the paper!")
-            raise ValueError("Tweet must include a link to the paper!")
-        return v
+    return {"Tweet": outputs.Tweet, "Email": outputs.Email}
 
 
-class Email(BaseModel):
-    """
-    Pydantic Model to generate an structured Email
-    """
-    subject: str = Field(..., description="Email subject")
-    body: str = Field(..., description="Email body")
+def __getattr__(name: str):
+    # coral.Tweet and coral.Email resolve lazily (PEP 562)
+    if name in ("Tweet", "Email"):
+        return _models()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Token metric of the LCEL tasks, named after the methods that run them
+TASK_METRICS = {
+    "abstract": "CohereEngine.enrich_abstract",
+    "keywords": "CohereEngine.extract_keywords",
+    "tweet": "CohereEngine.generate_tweet",
+    "email": "CohereEngine.generate_email",
+}
 
 
 class CohereEngine:
-    def __init__(self) -> None:
+    def __init__(self, limiter: RateLimiter = None) -> None:
+        """
+        Parameters:
+        - limiter (RateLimiter): Optional rate limit of the Cohere API, acquired before every request (retries included)
+        """
         logging.basicConfig(level=logging.INFO,
                             format="%(asctime)s [%(levelname)s] %(message)s")
         self.vars = self.__load_environment_vars()
         self.cohere = self.__cohere_client(self.vars["COHERE_API_KEY"])
-        self.templates = self.__load_prompt_templates()
+        if limiter is not None:
+            self.cohere = RateLimitedClient(self.cohere, limiter)
+        self.chains = ChainRegistry(output_models=_models(), limiter=limiter)
+        self.chains.watch()
+        self.papers = PaperCache()
 
         logging.info("Initialized CohereEngine")
 
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
+    def prompt_version(self, task: str) -> str:
+        """
+        Version stamp of the prompt templates and settings of a task, changes when they are edited
+        in prompts/athena.toml (edits to other tasks leave it unchanged).
+        """
+        return self.chains.task_version(task)
+
+
+    @property
+    def templates(self) -> dict:
+        return self.chains.templates
+
+
+    @instrument()
+    @coalesce
+    @resilient("cohere-generate", stale=False)  # keyed on the whole article
+    @meter_tokens()
     def query_article(self, article: str, query: str):
         """
         Query Article.
@@ -60,10 +95,10 @@ class CohereEngine:
         - str: Relevant passages from the article
         """
         logging.info("query_llm (started)")
-        
-        rag = CohereRagRetriever(llm=ChatCohere())
-        docs = rag.get_relevant_documents(query, 
-                                          source_documents=[Document(page_content=article)])
+        from langchain.schema.document import Document
+
+        docs = self.chains.rag_retriever().get_relevant_documents(query, 
+                                                                  source_documents=[Document(page_content=article)])
 
         #ranked_docs = self.cohere.rerank(query=query, documents=docs, top_n=4, model="rerank-english-v2.0")
 
@@ -71,7 +106,9 @@ class CohereEngine:
         return docs
 
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
+    @instrument()
+    @coalesce
+    @resilient("cohere-generate")
     def generate_tweet(self, summary: str, link: str) -> Tweet:
         """
         Generate an structured Tweet object about a research paper.
@@ -86,18 +123,16 @@ class CohereEngine:
         """
         logging.info(f"generate_tweet ({link}) (started)")
 
-        model = Cohere(model='command', temperature=0.3, max_tokens=250)
-        prompt = PromptTemplate.from_template(self.templates['tweet']['prompt'])
-        parser = PydanticOutputParser(pydantic_object=Tweet)
-
-        tweet_chain = prompt | model | parser
-        tweet = tweet_chain.invoke({"summary": summary, "link": link})
+        inputs = {"summary": summary, "link": link}
+        tweet = self.__generate('tweet', inputs, summary)
 
         logging.info("generate_tweet (OK)")
         return tweet
     
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
+    @instrument()
+    @coalesce
+    @resilient("cohere-generate")
     def generate_email(self, sender: str, institution: str, receivers: list, title: str, topic: str) -> Email:     
         """
         Generate an structured Email object to the authors of a research paper.
@@ -112,22 +147,20 @@ class CohereEngine:
         """
         logging.info("generate_email (started)")
 
-        model = Cohere(model='command', temperature=0.1, max_tokens=500)
-        prompt = PromptTemplate.from_template(self.templates['email']['prompt'])
-        parser = PydanticOutputParser(pydantic_object=Email)
+        inputs = {"sender": sender,
+                  "institution": institution,
+                  "receivers": receivers,
+                  "title": title,
+                  "topic": topic}
+        email = self.__generate('email', inputs, title)
 
-        email_chain = prompt | model | parser
-        email = email_chain.invoke({"sender": sender, 
-                                    "institution": institution, 
-                                    "receivers": receivers, 
-                                    "title": title, 
-                                    "topic": topic})
-        
         logging.info("generate_email (OK)")
         return email
     
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
+    @instrument()
+    @coalesce
+    @resilient("cohere-generate")
     def enrich_abstract(self, text: str) -> str:
         """
         Identifies technical Named Entities, and enrich them with Wikipedia Links.
@@ -140,17 +173,15 @@ class CohereEngine:
         """
         logging.info("enrich_abstract (started)")
 
-        model = Cohere(model='command', temperature=0.3, max_tokens=4096, truncate=None)
-        prompt = PromptTemplate.from_template(self.templates['abstract']['prompt'])
-
-        abstract_chain = prompt | model
-        abstract = abstract_chain.invoke({"text": text})
+        abstract = self.__generate('abstract', {"text": text}, text)
 
         logging.info("enrich_abstract (OK)")
         return abstract
     
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
+    @instrument()
+    @coalesce
+    @resilient("cohere-generate")
     def extract_keywords(self, text: str) -> str:
         """
         Extract keywords from a research paper. For each keyword, it provides a brief explanation of its significance in the context of this research.
@@ -163,17 +194,58 @@ class CohereEngine:
         """
         logging.info("extract_keywords (started)")
 
-        model = Cohere(model='command', temperature=0.1, max_tokens=4096)
-        prompt = PromptTemplate.from_template(self.templates['keywords']['prompt'])
-
-        keywords_chain = prompt | model
-        keywords = keywords_chain.invoke({"text": text})
+        keywords = self.__generate('keywords', {"text": text}, text)
 
         logging.info("extract_keywords (OK)")
         return keywords
 
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
+    def __generate(self, task: str, inputs: dict, text: str):
+        """
+        Run the chain of a task within its token budget (see tokenbudget.py).
+        An output that the API reports as cut off at max_tokens is regenerated once with an enlarged budget, and
+        rejected if it is still cut off, so that it is neither cached nor stored as a valid result.
+
+        Parameters:
+        - task (str): Task of the ChainRegistry
+        - inputs (dict): Variables of the prompt
+        - text (str): Input the output size scales with
+
+        Returns:
+        - Output of the chain
+        """
+        budget = tokenbudget.plan(task, self.chains, inputs, text)
+        output, finish_reason = self.__invoke(budget, inputs)
+        if finish_reason != tokenbudget.MAX_TOKENS:
+            return output
+
+        larger = tokenbudget.enlarge(budget)
+        if larger is not None:
+            logging.warning(f"{task}: output cut off at {budget.max_tokens} tokens, retrying with {larger.max_tokens}")
+            output, finish_reason = self.__invoke(larger, inputs)
+            if finish_reason != tokenbudget.MAX_TOKENS:
+                return output
+            budget = larger
+        raise tokenbudget.TruncatedOutput(f"{task}: output cut off at {budget.max_tokens} tokens")
+
+    def __invoke(self, budget: tokenbudget.Budget, inputs: dict):
+        """
+        Run the chain of a budget, and return its output with the finish reason of its generation (None if the
+        model does not report it, in which case the output is never taken as cut off).
+        """
+        with tokenbudget.finish_reasons() as reasons:
+            output = self.chains.chain(budget.task, budget.variant, budget.max_tokens).invoke(inputs)
+        finish_reason = reasons[-1] if reasons else None
+        tokenbudget.record(budget, output, finish_reason)
+        # metered per API call with the rendered prompt, unlike the methods metered on their arguments
+        record_tokens(TASK_METRICS[budget.task], budget.prompt_tokens, tokenbudget.output_tokens(output))
+        return output, finish_reason
+
+
+    @instrument()
+    @coalesce
+    @resilient("cohere-generate")
+    @meter_tokens()
     def summarize(self, text: str) -> str:
         logging.info("summarize (started)")
 
@@ -190,25 +262,68 @@ class CohereEngine:
         return response.summary
     
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
-    def embed(self, texts: dict) -> dict:
+    @instrument()
+    @coalesce
+    @resilient("cohere-embed")
+    @meter_tokens()
+    def embed(self, texts: dict, input_type: str = 'search_document') -> dict:
+        """
+        Embed texts with embed-english-v3.0: 'search_document' for indexed texts, 'search_query' for queries.
+        """
         return self.cohere.embed(
             model='embed-english-v3.0',
             texts=texts,
-            input_type='search_document',
+            input_type=input_type,
         ).embeddings
     
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
+    @instrument()
+    @coalesce
     def load_arxiv_paper(self, paper_id: str) -> (dict, str):
-        logging.info("load_arxiv_paper (started)")
+        """
+        Load the metadata and full text of an arXiv paper.
+        Papers are served from the local PaperCache, and only downloaded and extracted on a cache miss.
 
-        docs = ArxivLoader(query=paper_id, load_max_docs=2, load_all_available_meta=True).load()
-        metadata = docs[0].metadata
-        content = docs[0].page_content
+        Parameters:
+        - paper_id (str): arXiv ID, optionally versioned
+
+        Returns:
+        - (dict, str): Metadata and content of the paper
+        """
+        logging.info(f"load_arxiv_paper ({paper_id}) (started)")
+
+        cached = self.papers.get(paper_id)
+        if cached:
+            logging.info("load_arxiv_paper (OK, cached)")
+            return cached
+
+        metadata, content = self.__download_arxiv_paper(paper_id)
+        self.papers.put(metadata, content)
 
         logging.info("load_arxiv_paper (OK)")
         return metadata, content
+
+
+    # full texts are cached by PaperCache; an unknown ID is the caller's error, not an arXiv failure
+    @resilient("arxiv", excluded=(ValueError, LookupError), stale=False)
+    def __download_arxiv_paper(self, paper_id: str) -> (dict, str):
+        """
+        Search, download and extract the text of an arXiv paper.
+        Raises LookupError if arXiv has no paper with that ID.
+        """
+        docs = self._search_arxiv(paper_id)
+        if not docs:
+            raise LookupError(f"arXiv paper '{paper_id}' not found")
+        return docs[0].metadata, docs[0].page_content
+
+
+    def _search_arxiv(self, paper_id: str) -> list:
+        """
+        Documents (metadata and full text) of the arXiv papers matching an ID, loaded with ArxivLoader.
+        """
+        from langchain.document_loaders import ArxivLoader
+
+        return ArxivLoader(query=paper_id, load_max_docs=2, load_all_available_meta=True).load()
     
 
     def __load_environment_vars(self):
@@ -228,23 +343,6 @@ class CohereEngine:
         return env_vars
     
 
-    def __load_prompt_templates(self):
-        """
-        Load prompt templates from prompts/athena.toml
-        """
-        logging.info("load_prompt_templates (started)")
-
-        try:
-            with open("prompts/athena.toml", "rb") as f:
-                prompts = tomli.load(f)
-        except FileNotFoundError as e:
-            logging.error(e)
-            raise OSError("Prompt templates file not found.")
-        
-        logging.info("load_prompt_templates (OK)")
-        return prompts
-    
-    
     @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(5))
     def __cohere_client(self, cohere_api_key):
         """
@@ -256,4 +354,6 @@ class CohereEngine:
         Returns:
         - cohere.Client: Cohere client
         """
+        import cohere
+
         return cohere.Client(cohere_api_key)
\ No newline at end of file
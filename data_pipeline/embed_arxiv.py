@@ -8,6 +8,7 @@ from dotenv import load_dotenv
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
 BATCH_SIZE = 500
+BATCH_PAUSE_SECONDS = 5  # stay within the Cohere rate limit
 ARXIV_JSON = "data/arxiv_cs.CL.json"
 ARXIV_EMBEDDINGS_JSONL = "data/arxiv_cs.CL_embedv3.jsonl"
 
@@ -52,7 +53,7 @@ def process_embeddings_and_save(data, co_client, filename):
                 batch = data[i:i + BATCH_SIZE]
                 logging.info(f"embeddings_batch: {i} to {i + BATCH_SIZE}")
                 embed_batch(batch, co_client, file)
-                time.sleep(5)
+                time.sleep(BATCH_PAUSE_SECONDS)
     except Exception as e:
         logging.error(f"Error saving to JSONL: {e}")
 
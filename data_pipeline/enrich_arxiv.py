@@ -0,0 +1,117 @@
+"""
+Precompute CohereEngine tasks over the whole indexed corpus, so that the app serves corpus papers with a lookup.
+
+Run from the repository root (prompt templates and data files are resolved relative to it):
+
+    python -m data_pipeline.enrich_arxiv
+
+The job is resumable: results are checkpointed to the EnrichmentStore after every batch,
+and (paper, task) pairs that are already stored are skipped on the next run. Results are stored with the version
+of the prompt templates of their task, so that after a prompt change the next run recomputes that task only.
+"""
+import logging
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import chains
+import coral
+from enrichmentstore import EnrichmentStore
+from metadatastore import MetadataStore
+from resilience import BREAKERS, CircuitOpenError, RateLimiter
+
+TASKS = ["abstract", "keywords", "summary", "tweet"]
+MAX_CONCURRENCY = 4
+REQUESTS_PER_MINUTE = 60
+CHECKPOINT_BATCH_SIZE = 100
+MAX_CONSECUTIVE_FAILURES = 20  # failed Cohere requests in a row, as counted by the circuit breaker
+
+
+def run_task(engine: coral.CohereEngine, task: str, metadata: dict) -> str:
+    """Run a CohereEngine task on a paper and return its result as text."""
+    if task == "abstract":
+        return engine.enrich_abstract(text=metadata['Summary'])
+    if task == "keywords":
+        return engine.extract_keywords(text=metadata['Summary'])
+    if task == "summary":
+        return engine.summarize(text=metadata['Summary'])
+    if task == "tweet":
+        return engine.generate_tweet(summary=metadata['Summary'], link=metadata['entry_id']).text
+    raise ValueError(f"Unknown task '{task}'")
+
+
+def prompt_version(engine: coral.CohereEngine, task: str) -> str:
+    """Version of the prompt templates of a task ('' for summaries, which use the summarize endpoint)."""
+    return engine.prompt_version(task) if task in chains.TASKS else ""
+
+
+def pending_jobs(engine: coral.CohereEngine, metadata_store: MetadataStore, enrichment_store: EnrichmentStore):
+    """Yield the (arxiv_id, task, metadata) jobs that have not been computed yet with the current prompts."""
+    completed = {task: enrichment_store.completed(task, prompt_version(engine, task)) for task in TASKS}
+    for arxiv_id, metadata in metadata_store.iter_all():
+        for task in TASKS:
+            if arxiv_id not in completed[task]:
+                yield arxiv_id, task, metadata
+
+
+def enrich_corpus(engine: coral.CohereEngine, metadata_store: MetadataStore, enrichment_store: EnrichmentStore):
+    """
+    Run the pending jobs in checkpointed batches. Jobs short-circuited by the open Cohere circuit are not failures:
+    they are queued again once the circuit has had 'reset_timeout' to recover. The run stops once
+    MAX_CONSECUTIVE_FAILURES Cohere requests have failed in a row, rather than sweeping the corpus during an outage.
+    """
+    def work(arxiv_id, task, metadata):
+        version = prompt_version(engine, task)  # before the call, in case the templates are reloaded meanwhile
+        return arxiv_id, task, run_task(engine, task, metadata), version
+
+    breaker = BREAKERS["cohere-generate"]
+    jobs = pending_jobs(engine, metadata_store, enrichment_store)
+    requeued = deque()
+    done, failed = 0, 0
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        while breaker.failures < MAX_CONSECUTIVE_FAILURES:
+            batch = [requeued.popleft() for _ in range(min(len(requeued), CHECKPOINT_BATCH_SIZE))]
+            batch += [job for _, job in zip(range(CHECKPOINT_BATCH_SIZE - len(batch)), jobs)]
+            if not batch:
+                break
+
+            results, short_circuited = [], 0
+            futures = {executor.submit(work, *job): job for job in batch}
+            for future in as_completed(futures):
+                arxiv_id, task, _ = futures[future]
+                try:
+                    results.append(future.result())
+                except CircuitOpenError:
+                    requeued.append(futures[future])
+                    short_circuited += 1
+                except Exception as e:
+                    failed += 1
+                    logging.error(f"{task} ({arxiv_id}) (ERROR): {e}")
+
+            enrichment_store.put_many(results)
+            done += len(results)
+            logging.info(f"Checkpoint: {done} results stored, {failed} failed, {len(requeued)} requeued")
+
+            if short_circuited and breaker.state != breaker.CLOSED:
+                logging.warning(f"Circuit '{breaker.name}' is open, waiting {breaker.reset_timeout}s")
+                time.sleep(breaker.reset_timeout)
+
+    if breaker.failures >= MAX_CONSECUTIVE_FAILURES:
+        logging.error(f"Enrichment stopped after {breaker.failures} consecutive failed Cohere requests")
+    return done, failed
+
+
+def main():
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+
+    # every Cohere request of the engine, retries included, goes through the limiter
+    engine = coral.CohereEngine(limiter=RateLimiter(REQUESTS_PER_MINUTE))
+    done, failed = enrich_corpus(engine, MetadataStore(), EnrichmentStore())
+    logging.info(f"Enrichment completed: {done} results stored, {failed} failed (re-run to retry).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,69 @@
+import argparse
 import pandas as pd
 import weaviate
 import logging
 import os
 
 from dotenv import load_dotenv
+from weaviatestore import CATEGORIES, class_name_for, partitions_of
 
 ARXIV_JSON = "data/arXiv.cs.CL.embedv3.jsonl"  # "data/arxiv.cs.CL.json"
-SCHEMA_NAME = "ArxivDocument_CS_CL"
+EMBEDDING_DIM = 1024  # embed-english-v3.0
+COMPRESSIONS = ["none", "pq", "bq"]
 
 
-def index_data(cohere_api_key: str, weaviate_url: str, weaviate_api_key: str):
-    """Index Data into Weaviate"""
-    logging.info(f"Loading data from '{ARXIV_JSON}'")
-    df = pd.read_json(ARXIV_JSON, lines=True)
-
-    logging.info(f"Initializing Weaviate Client: '{weaviate_url}'")
-    client = weaviate.Client(
-        url=weaviate_url,
-        auth_client_secret=weaviate.AuthApiKey(api_key=weaviate_api_key),
-        additional_headers={"X-Cohere-Api-Key": cohere_api_key})
+def vector_index_config(compression: str = "none", ef: int = -1, ef_construction: int = 128,
+                        max_connections: int = 64, pq_segments: int = EMBEDDING_DIM // 4) -> dict:
+    """
+    HNSW vector index configuration (the defaults are Weaviate's), optionally with vector compression:
+    - pq: Product Quantization, each vector is encoded in 'pq_segments' bytes (256 centroids per segment).
+      The codebook is trained on the indexed vectors, so index_data enables it after the import.
+    - bq: Binary Quantization, 1 bit per dimension (requires Weaviate >= 1.24 for HNSW).
+    Compressed vectors are kept in memory, and the full vectors on disk to rescore the candidates.
+
+    Parameters:
+    - compression (str): One of COMPRESSIONS
+    - ef (int): Size of the dynamic candidate list at query time (-1: dynamic, based on the limit)
+    - ef_construction (int): Size of the candidate list when building the graph
+    - max_connections (int): Maximum number of connections per node (2x on the base layer)
+    - pq_segments (int): Number of PQ segments, must divide the vector dimension
+
+    Returns:
+    - dict: 'vectorIndexConfig' of the Weaviate class
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {COMPRESSIONS}")
+
+    config = {
+        "distance": "cosine",  # Set to "cosine" for English models; "dot" for multilingual models
+        "ef": ef,
+        "efConstruction": ef_construction,
+        "maxConnections": max_connections,
+    }
+    if compression == "pq":
+        config["pq"] = {"enabled": True, "segments": pq_segments, "centroids": 256,
+                        "encoder": {"type": "kmeans", "distribution": "log-normal"}}
+    elif compression == "bq":
+        config["bq"] = {"enabled": True}
+    return config
 
-    logging.info(
-        f"Deleting '{SCHEMA_NAME}' schema in Weaviate: '{weaviate_url}'")
-    client.schema.delete_class(SCHEMA_NAME)
 
+def class_schema(class_name: str, description: str, index_config: dict) -> dict:
     """
+    Schema of a Weaviate class of arXiv documents.
+
     Weaviate generates vector embeddings at the object level (rather than for individual properties).
     text2vec-* modules  generate vectors from text objects. 
     It vectorizes only properties that use the text data type (unless skipped)
 
     See: https://weaviate.io/developers/weaviate/config-refs/schema#vectorizer 
     """
-
-    logging.info(
-        f"Creating '{SCHEMA_NAME}' schema in Weaviate: '{weaviate_url}'")
-
-    class_obj = {
-        "class": SCHEMA_NAME,
-        "description": "This class contains Arxiv Documents in the CS.CL category",
+    return {
+        "class": class_name,
+        "description": description,
         "vectorIndexType": "hnsw",
         "vectorizer": "text2vec-cohere",
-        "vectorIndexConfig": {
-            "distance": "cosine"  # Set to "cosine" for English models; "dot" for multilingual models
-        },
+        "vectorIndexConfig": index_config,
         "moduleConfig": {
             "text2vec-cohere": {
                 "model": "embed-english-v3.0",
@@ -91,9 +112,52 @@ def index_data(cohere_api_key: str, weaviate_url: str, weaviate_api_key: str):
             },
         ]
     }
-    client.schema.create_class(class_obj)
 
-    logging.info(f"Importing data to Weaviate: '{weaviate_url}'")
+
+def index_data(cohere_api_key: str, weaviate_url: str, weaviate_api_key: str,
+               class_name: str = None, index_config: dict = None):
+    """
+    Index Data into Weaviate.
+    Papers are partitioned into one class per category, and a cross-listed paper is indexed into the class of
+    each of its categories (see weaviatestore.partitions_of), so that category-scoped searches only touch their
+    partitions and still find it. With class_name, all papers are indexed into that single class.
+
+    Parameters:
+    - cohere_api_key (str): Cohere API key
+    - weaviate_url (str): Weaviate URL
+    - weaviate_api_key (str): Weaviate API key
+    - class_name (str): Single Weaviate class to (re)create, instead of the category partitions
+    - index_config (dict): Vector index configuration, see vector_index_config (default: plain HNSW)
+    """
+    index_config = dict(index_config or vector_index_config())
+    pq_config = index_config.pop("pq", None)
+
+    logging.info(f"Loading data from '{ARXIV_JSON}'")
+    df = pd.read_json(ARXIV_JSON, lines=True)
+
+    if class_name:
+        df["class_name"] = class_name
+        descriptions = {class_name: "This class contains Arxiv Documents"}
+    else:
+        df["class_name"] = df["categories"].map(lambda categories: [class_name_for(c)
+                                                                    for c in partitions_of(categories)])
+        df = df.explode("class_name")
+        descriptions = {class_name_for(c): f"This class contains Arxiv Documents in the {c.upper()} category"
+                        for c in CATEGORIES}
+
+    logging.info(f"Initializing Weaviate Client: '{weaviate_url}'")
+    client = weaviate.Client(
+        url=weaviate_url,
+        auth_client_secret=weaviate.AuthApiKey(api_key=weaviate_api_key),
+        additional_headers={"X-Cohere-Api-Key": cohere_api_key})
+
+    for name, description in descriptions.items():
+        logging.info(f"Deleting '{name}' schema in Weaviate: '{weaviate_url}'")
+        client.schema.delete_class(name)
+        logging.info(f"Creating '{name}' schema in Weaviate: '{weaviate_url}'")
+        client.schema.create_class(class_schema(name, description, index_config))
+
+    logging.info(f"Importing data to Weaviate: '{weaviate_url}' ({df['class_name'].value_counts().to_dict()})")
 
     try:
         with client.batch as batch:
@@ -113,12 +177,17 @@ def index_data(cohere_api_key: str, weaviate_url: str, weaviate_api_key: str):
                 if (item.embeddings):
                     batch.add_data_object(
                         data_object=properties,
-                        class_name=SCHEMA_NAME,
+                        class_name=item.class_name,
                         vector=item.embeddings["summary"])
                 else:
                     batch.add_data_object(
                         data_object=properties,
-                        class_name=SCHEMA_NAME)
+                        class_name=item.class_name)
+
+        if pq_config:
+            for name in descriptions:
+                logging.info(f"Enabling product quantization on '{name}' (trains on the imported vectors)")
+                client.schema.update_config(name, {"vectorIndexConfig": {"pq": pq_config}})
     except Exception as ex:
         logging.error(f"Unexpected Error: {ex}")
         raise
@@ -147,13 +216,25 @@ def load_environment_vars() -> dict:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Index the embedded arXiv corpus into Weaviate.")
+    parser.add_argument("--class-name", help="Index into this single class instead of one class per category")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none")
+    parser.add_argument("--ef", type=int, default=-1)
+    parser.add_argument("--ef-construction", type=int, default=128)
+    parser.add_argument("--max-connections", type=int, default=64)
+    parser.add_argument("--pq-segments", type=int, default=EMBEDDING_DIM // 4)
+    args = parser.parse_args()
+
     logging.basicConfig(level=logging.INFO,
                         format="%(asctime)s [%(levelname)s] %(message)s")
 
     try:
         env_vars = load_environment_vars()
+        index_config = vector_index_config(args.compression, args.ef, args.ef_construction,
+                                           args.max_connections, args.pq_segments)
         index_data(env_vars["COHERE_API_KEY"],
-                   env_vars["WEAVIATE_URL"], env_vars["WEAVIATE_API_KEY"])
+                   env_vars["WEAVIATE_URL"], env_vars["WEAVIATE_API_KEY"],
+                   class_name=args.class_name, index_config=index_config)
     except EnvironmentError as ee:
         logging.error(f"Environment Error: {ee}")
         raise
@@ -0,0 +1,121 @@
+import glob
+import json
+import logging
+import os
+import re
+import sqlite3
+
+ARXIV_JSON = "data/arxiv_cs*.json"
+METADATA_DB = "data/arxiv_metadata.db"
+
+SCHEMA = """
+CREATE TABLE papers (
+    arxiv_id    TEXT PRIMARY KEY,
+    version     INTEGER NOT NULL,
+    entry_id    TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    authors     TEXT NOT NULL,
+    categories  TEXT NOT NULL,
+    summary     TEXT NOT NULL,
+    link_pdf    TEXT,
+    published   TEXT,
+    updated     TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE paper_authors (
+    author      TEXT NOT NULL COLLATE NOCASE,
+    arxiv_id    TEXT NOT NULL,
+    PRIMARY KEY (author, arxiv_id)
+) WITHOUT ROWID;
+"""
+
+UPSERT_PAPER = """
+INSERT INTO papers VALUES (:arxiv_id, :version, :entry_id, :title, :authors, :categories, :summary, :link_pdf, :published, :updated)
+ON CONFLICT (arxiv_id) DO UPDATE SET
+    version = excluded.version, entry_id = excluded.entry_id, title = excluded.title, authors = excluded.authors,
+    categories = excluded.categories, summary = excluded.summary, link_pdf = excluded.link_pdf,
+    published = excluded.published, updated = excluded.updated
+WHERE excluded.version >= papers.version
+"""
+
+ARXIV_ID = re.compile(r"^(?P<id>.+?)(?:v(?P<version>\d+))?$")
+
+
+def load_json(filename):
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except Exception as e:
+        logging.error(f"An error occurred while loading JSON: {e}")
+        return []
+
+
+def to_row(paper: dict) -> dict:
+    """Map a harvested paper (see retrieve_arxiv.parse_xml) to a 'papers' row."""
+    match = ARXIV_ID.match(paper['id'].split('/abs/')[-1])
+    return {
+        "arxiv_id": match.group("id"),
+        "version": int(match.group("version") or 1),
+        "entry_id": paper['id'],
+        "title": paper['title'],
+        "authors": paper['authors'],
+        "categories": paper['categories'],
+        "summary": paper['summary'],
+        "link_pdf": paper.get('link_pdf'),
+        "published": paper.get('published'),
+        "updated": paper.get('updated'),
+    }
+
+
+def build_index(filenames: list, db_file: str) -> int:
+    """
+    Build the SQLite metadata index from the harvested arXiv JSON files.
+    The index is written to a temporary file and swapped in atomically.
+    """
+    tmp_file = f"{db_file}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    conn = sqlite3.connect(tmp_file)
+    try:
+        conn.executescript(SCHEMA)
+        for filename in filenames:
+            logging.info(f"Indexing metadata from '{filename}'")
+            rows = [to_row(paper) for paper in load_json(filename)]
+            conn.executemany(UPSERT_PAPER, rows)
+
+        conn.execute("""
+            INSERT OR IGNORE INTO paper_authors (author, arxiv_id)
+            WITH RECURSIVE split(arxiv_id, author, rest) AS (
+                SELECT arxiv_id, '', authors || ', ' FROM papers
+                UNION ALL
+                SELECT arxiv_id, trim(substr(rest, 1, instr(rest, ', ') - 1)), substr(rest, instr(rest, ', ') + 2)
+                FROM split WHERE rest <> ''
+            )
+            SELECT author, arxiv_id FROM split WHERE author <> ''
+        """)
+        count = conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_file, db_file)
+    return count
+
+
+def main():
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+
+    filenames = sorted(glob.glob(ARXIV_JSON))
+    if not filenames:
+        logging.error(f"No harvested files match '{ARXIV_JSON}'.")
+        return
+
+    count = build_index(filenames, METADATA_DB)
+    logging.info(f"Indexed {count} papers into '{METADATA_DB}'.")
+
+
+if __name__ == "__main__":
+    main()
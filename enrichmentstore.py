@@ -0,0 +1,89 @@
+import logging
+import sqlite3
+import threading
+
+from papercache import split_arxiv_id
+from telemetry import instrument, record_cache
+
+ENRICHMENTS_DB = "data/arxiv_enrichments.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS enrichments (
+    arxiv_id        TEXT NOT NULL,
+    task            TEXT NOT NULL,
+    result          TEXT NOT NULL,
+    prompt_version  TEXT NOT NULL DEFAULT '',
+    created_at      TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (arxiv_id, task)
+) WITHOUT ROWID;
+"""
+
+
+class EnrichmentStore:
+    """
+    SQLite store of precomputed CohereEngine results (abstract, keywords, summary, tweet) keyed by arXiv ID and task.
+    It is filled offline by data_pipeline/enrich_arxiv.py, and read by the app to serve corpus papers with a lookup.
+    Every result is stored with the version of the prompt templates it was generated with (see ChainRegistry.task_version),
+    so that results of outdated prompts can be told apart.
+    """
+
+    def __init__(self, db_file: str = ENRICHMENTS_DB) -> None:
+        self.db_file = db_file
+        self._local = threading.local()
+        with self.__conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        logging.info(f"Initialized EnrichmentStore: '{db_file}'")
+
+    @instrument()
+    def get(self, paper_id: str, task: str, prompt_version: str = None) -> str:
+        """
+        Lookup a precomputed result.
+
+        Parameters:
+        - paper_id (str): arXiv ID, optionally versioned
+        - task (str): Task name, e.g. 'abstract'
+        - prompt_version (str): Version of the prompt templates the result must have been generated with (default: any)
+
+        Returns:
+        - str: Result of the task, or None if it has not been computed (with that prompt version)
+        """
+        base_id, _ = split_arxiv_id(paper_id)
+        row = self.__conn().execute("SELECT result, prompt_version FROM enrichments WHERE arxiv_id = ? AND task = ?",
+                                    (base_id, task)).fetchone()
+        hit = row is not None and (prompt_version is None or row[1] == prompt_version)
+        record_cache(f"enrichment_store.{task}", hit=hit)
+        return row[0] if hit else None
+
+    @instrument()
+    def put_many(self, results: list) -> None:
+        """
+        Store a batch of results in a single transaction.
+
+        Parameters:
+        - results (list): Tuples of (arxiv_id, task, result, prompt_version)
+        """
+        with self.__conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO enrichments (arxiv_id, task, result, prompt_version) "
+                             "VALUES (?, ?, ?, ?)",
+                             [(split_arxiv_id(paper_id)[0], task, result, prompt_version)
+                              for paper_id, task, result, prompt_version in results])
+
+    def completed(self, task: str, prompt_version: str = None) -> set:
+        """
+        Return the arXiv IDs for which a task has already been computed (with the given prompt version, if any).
+        """
+        if prompt_version is None:
+            rows = self.__conn().execute("SELECT arxiv_id FROM enrichments WHERE task = ?", (task,)).fetchall()
+        else:
+            rows = self.__conn().execute("SELECT arxiv_id FROM enrichments WHERE task = ? AND prompt_version = ?",
+                                         (task, prompt_version)).fetchall()
+        return {row[0] for row in rows}
+
+    def __conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file)
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,114 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from papercache import split_arxiv_id
+from telemetry import instrument, record_cache
+
+METADATA_DB = "data/arxiv_metadata.db"
+
+_COLUMNS = "arxiv_id, version, entry_id, title, authors, categories, summary, link_pdf, published, updated"
+
+
+class MetadataStore:
+    """
+    Read-only lookup of arXiv paper metadata in the SQLite index built by data_pipeline/index_metadata.py.
+    Lookups hit a primary key index and take well under a millisecond, so the app does not need to
+    contact the arXiv API to render a paper of the corpus.
+    """
+
+    def __init__(self, db_file: str = METADATA_DB) -> None:
+        if not os.path.exists(db_file):
+            raise FileNotFoundError(f"Metadata index '{db_file}' not found.")
+
+        self.db_file = db_file
+        self._local = threading.local()
+
+        logging.info(f"Initialized MetadataStore: '{db_file}'")
+
+    @instrument()
+    def get(self, paper_id: str) -> dict:
+        """
+        Lookup a paper by exact arXiv ID. The version suffix, if any, is ignored.
+
+        Parameters:
+        - paper_id (str): arXiv ID, e.g. '1810.04805' or 'http://arxiv.org/abs/1810.04805v2'
+
+        Returns:
+        - dict: Metadata in the same format as ArxivLoader, or None if the paper is not in the corpus
+        """
+        base_id, _ = split_arxiv_id(paper_id)
+        row = self.__conn().execute(f"SELECT {_COLUMNS} FROM papers WHERE arxiv_id = ?", (base_id,)).fetchone()
+        record_cache("metadata_index", hit=row is not None)
+        return self.__to_metadata(row) if row else None
+
+    @instrument()
+    def find_by_prefix(self, prefix: str, limit: int = 20) -> list:
+        """
+        Lookup papers whose arXiv ID starts with a prefix, e.g. '2311.' for all papers of November 2023.
+
+        Parameters:
+        - prefix (str): arXiv ID prefix
+        - limit (int): Maximum number of results
+
+        Returns:
+        - list: Metadata of the matching papers, sorted by arXiv ID
+        """
+        rows = self.__conn().execute(
+            f"SELECT {_COLUMNS} FROM papers WHERE arxiv_id >= ? AND arxiv_id < ? ORDER BY arxiv_id LIMIT ?",
+            (prefix, prefix + "\uffff", limit)).fetchall()
+        return [self.__to_metadata(row) for row in rows]
+
+    @instrument()
+    def find_by_author(self, author: str, limit: int = 20) -> list:
+        """
+        Lookup papers by author full name (case insensitive).
+
+        Parameters:
+        - author (str): Author name as listed on arXiv, e.g. 'Jacob Devlin'
+        - limit (int): Maximum number of results
+
+        Returns:
+        - list: Metadata of the matching papers, most recent first
+        """
+        rows = self.__conn().execute(
+            f"SELECT {', '.join('p.' + c.strip() for c in _COLUMNS.split(','))} "
+            "FROM paper_authors a JOIN papers p ON p.arxiv_id = a.arxiv_id "
+            "WHERE a.author = ? ORDER BY p.published DESC LIMIT ?",
+            (author.strip(), limit)).fetchall()
+        return [self.__to_metadata(row) for row in rows]
+
+    def iter_all(self):
+        """
+        Iterate over the metadata of every paper in the index, sorted by arXiv ID.
+
+        Returns:
+        - generator: (arxiv_id, metadata) tuples
+        """
+        for row in self.__conn().execute(f"SELECT {_COLUMNS} FROM papers ORDER BY arxiv_id"):
+            yield row[0], self.__to_metadata(row)
+
+    def __conn(self) -> sqlite3.Connection:
+        """
+        SQLite connections cannot be shared across threads, and Streamlit runs each session in its own thread.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_file}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def __to_metadata(row: tuple) -> dict:
+        arxiv_id, version, entry_id, title, authors, categories, summary, link_pdf, published, updated = row
+        return {
+            "entry_id": entry_id,
+            "Published": (updated or published or "")[:10],
+            "Title": title,
+            "Authors": authors,
+            "Summary": summary,
+            "published_first_time": (published or "")[:10],
+            "categories": categories.split(", ") if categories else [],
+            "links": [entry_id, link_pdf] if link_pdf else [entry_id],
+        }
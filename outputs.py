@@ -0,0 +1,29 @@
+"""
+Pydantic models of the structured outputs of the CohereEngine. This module is imported on first use (see
+coral._models), so that starting the app does not pay for pydantic.
+"""
+import logging
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class Tweet(BaseModel):
+    """
+    Pydantic Model to generate an structured Tweet with Validation
+    """
+    text: str = Field(..., description="Tweet text")
+
+    @field_validator('text')
+    def validate_text(cls, v: str) -> str:
+        if "https://" not in v and "http://" not in v:
+            logging.error("Tweet does not include a link to the paper!")
+            raise ValueError("Tweet must include a link to the paper!")
+        return v
+
+
+class Email(BaseModel):
+    """
+    Pydantic Model to generate an structured Email
+    """
+    subject: str = Field(..., description="Email subject")
+    body: str = Field(..., description="Email body")
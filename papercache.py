@@ -0,0 +1,176 @@
+import glob
+import json
+import logging
+import os
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from telemetry import instrument, record_cache
+
+CACHE_DIR = "data/cache/papers"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+_ARXIV_ID = re.compile(r"^(?P<id>.+?)(?:v(?P<version>\d+))?$")
+
+
+def split_arxiv_id(paper_id: str) -> (str, int):
+    """
+    Split an arXiv identifier into its base ID and version.
+
+    Parameters:
+    - paper_id (str): ID in the form '1810.04805', '1810.04805v2' or 'http://arxiv.org/abs/1810.04805v2'
+
+    Returns:
+    - (str, int): Base ID and version (None if unversioned)
+
+    Raises:
+    - ValueError: If the ID is empty
+    """
+    paper_id = paper_id.strip().split("/abs/")[-1]
+    match = _ARXIV_ID.match(paper_id)
+    if match is None:
+        raise ValueError("Empty arXiv ID")
+    version = match.group("version")
+    return match.group("id"), int(version) if version else None
+
+
+class PaperCache:
+    """
+    Persistent store of arXiv papers (metadata and extracted full text) keyed by arXiv ID and version.
+    The least recently used entries are evicted once the store grows beyond 'max_bytes'.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @instrument()
+    def get(self, paper_id: str):
+        """
+        Lookup a paper in the cache. Unversioned IDs resolve to the latest cached version.
+
+        Parameters:
+        - paper_id (str): arXiv ID, optionally versioned
+
+        Returns:
+        - (dict, str): Metadata and content, or None on a cache miss
+        """
+        path = self.__resolve(paper_id)
+        if not path:
+            record_cache("paper_cache", hit=False)
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logging.warning(f"paper_cache ({paper_id}) unreadable entry: {e}")
+            record_cache("paper_cache", hit=False)
+            return None
+
+        record_cache("paper_cache", hit=True)
+        return entry["metadata"], entry["content"]
+
+    @instrument()
+    def put(self, metadata: dict, content: str) -> None:
+        """
+        Store a paper under the ID and version of its 'entry_id', and evict old entries if needed.
+
+        Parameters:
+        - metadata (dict): Paper metadata as returned by ArxivLoader
+        - content (str): Extracted full text
+        """
+        base_id, version = split_arxiv_id(metadata["entry_id"])
+        path = self.__path(base_id, version or 1)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"metadata": metadata, "content": content}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+        self.__evict()
+
+    def __contains__(self, paper_id: str) -> bool:
+        return self.__resolve(paper_id) is not None
+
+    def __path(self, base_id: str, version: int) -> str:
+        return os.path.join(self.cache_dir, f"{base_id.replace('/', '_')}v{version}.json")
+
+    def __resolve(self, paper_id: str) -> str:
+        base_id, version = split_arxiv_id(paper_id)
+        if version:
+            path = self.__path(base_id, version)
+            return path if os.path.exists(path) else None
+
+        pattern = os.path.join(self.cache_dir, f"{glob.escape(base_id.replace('/', '_'))}v*.json")
+        candidates = [(split_arxiv_id(os.path.basename(p)[:-len(".json")])[1] or 0, p)
+                      for p in glob.glob(pattern)]
+        return max(candidates)[1] if candidates else None
+
+    def __evict(self) -> None:
+        with self._lock:
+            entries = []
+            for path in glob.glob(os.path.join(self.cache_dir, "*.json")):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logging.info(f"paper_cache evicted '{os.path.basename(path)}'")
+                except OSError:
+                    pass
+
+
+class PaperPrefetcher:
+    """
+    Warms the PaperCache in the background, e.g. with the similar articles of the paper being read.
+    """
+
+    def __init__(self, loader, cache: PaperCache, max_workers: int = 2) -> None:
+        """
+        Parameters:
+        - loader (callable): Function that loads (and caches) a paper by ID, e.g. CohereEngine.load_arxiv_paper
+        - cache (PaperCache): Cache to check before scheduling a download
+        - max_workers (int): Number of concurrent downloads
+        """
+        self.loader = loader
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="paper-prefetch")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def prefetch(self, paper_ids: list) -> None:
+        """
+        Schedule the download of papers that are neither cached nor already pending.
+
+        Parameters:
+        - paper_ids (list): arXiv IDs to warm
+        """
+        for paper_id in paper_ids:
+            with self._lock:
+                if paper_id in self._pending or paper_id in self.cache:
+                    continue
+                self._pending.add(paper_id)
+            self._executor.submit(self.__load, paper_id)
+
+    def __load(self, paper_id: str) -> None:
+        try:
+            self.loader(paper_id)
+            logging.info(f"prefetch ({paper_id}) (OK)")
+        except Exception as e:
+            logging.warning(f"prefetch ({paper_id}) (ERROR): {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(paper_id)
@@ -0,0 +1,300 @@
+import contextlib
+import contextvars
+import functools
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+from singleflight import freeze
+from tenacity import Retrying, retry_if_not_exception_type, stop_after_attempt, wait_random_exponential
+
+STALE_RESULTS_PER_METHOD = 256
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+# -----------------------------------------------------------------------------
+# Deadlines
+# -----------------------------------------------------------------------------
+
+def start_deadline(seconds: float) -> contextvars.Token:
+    """
+    Set the deadline of the current request (e.g. a Streamlit script run), 'seconds' from now.
+    The deadline caps retries and their backoff only: the first attempt of a call is always made.
+    It replaces any deadline left in the context, since Streamlit reruns a script in the same thread
+    (and context) as the run it interrupted.
+    """
+    return _deadline.set(time.monotonic() + seconds)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """
+    Context manager that bounds the total time spent on retries of the calls made within it.
+    Nested deadlines can only shorten the current one.
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(min(expires, current) if current else expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float:
+    """
+    Seconds left until the current deadline, or None if no deadline is set.
+    """
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+# -----------------------------------------------------------------------------
+# Rate Limits
+# -----------------------------------------------------------------------------
+
+class RateLimiter:
+    """
+    Token bucket shared by threads to stay within the rate limit of a downstream service.
+    """
+
+    def __init__(self, requests_per_minute: int) -> None:
+        self.interval = 60.0 / requests_per_minute
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """
+    Proxy of a Cohere client that acquires a RateLimiter before every API request, so that the retries of its
+    callers (@resilient, langchain) are limited as well. The retries of the client itself happen below the proxy
+    (in its HTTP adapter), so they are turned off.
+    """
+
+    REQUESTS = ("generate", "chat", "summarize", "embed", "rerank", "tokenize")
+
+    def __init__(self, client, limiter: RateLimiter) -> None:
+        client.max_retries = 0
+        self._client = client
+        self._limiter = limiter
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name not in self.REQUESTS:
+            return attr
+
+        @functools.wraps(attr)
+        def request(*args, **kwargs):
+            self._limiter.acquire()
+            return attr(*args, **kwargs)
+        return request
+
+
+# -----------------------------------------------------------------------------
+# Circuit Breakers
+# -----------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """
+    Tracks the health of a downstream service. After 'failure_threshold' consecutive failures the circuit opens
+    and calls fail fast; after 'reset_timeout' seconds a single trial call is let through (half-open), and
+    its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_total = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> None:
+        """
+        Raise CircuitOpenError unless a call to the downstream service is allowed.
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.__transition(self.HALF_OPEN)
+
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+        raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def release(self) -> None:
+        """
+        Give back a half-open trial whose call ended without an outcome (e.g. it was interrupted).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            if self.state != self.CLOSED:
+                self.__transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self.state != self.OPEN:
+                    self.opened_total += 1
+                    self.__transition(self.OPEN)
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "opened_total": self.opened_total}
+
+    def __transition(self, state: str) -> None:
+        logging.warning(f"circuit_breaker ({self.name}) {self.state} -> {state}")
+        self.state = state
+
+
+BREAKERS = {
+    "cohere-generate": CircuitBreaker("cohere-generate"),
+    "cohere-embed": CircuitBreaker("cohere-embed"),
+    "arxiv": CircuitBreaker("arxiv"),
+    "weaviate": CircuitBreaker("weaviate"),
+}
+
+
+# -----------------------------------------------------------------------------
+# Resilient Calls
+# -----------------------------------------------------------------------------
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _count(method: str, counter: str, n: int = 1) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(method, {"calls": 0, "retries": 0, "failures": 0,
+                                           "short_circuited": 0, "stale_served": 0})
+        stats[counter] += n
+
+
+def _stop_on_deadline(retry_state) -> bool:
+    left = remaining()
+    return left is not None and left <= 1.0
+
+
+def _wait_within_deadline(base_wait):
+    def wait(retry_state) -> float:
+        left = remaining()
+        seconds = base_wait(retry_state)
+        return seconds if left is None else max(0.0, min(seconds, left - 1.0))
+    return wait
+
+
+def resilient(downstream: str, attempts: int = 3, excluded: tuple = (ValueError,), stale: bool = True):
+    """
+    Decorator for calls to a downstream service (see BREAKERS). It retries with random exponential backoff
+    within the current deadline, fails fast while the circuit of the downstream service is open, and falls
+    back to the last successful result for the same arguments (if any) when the call cannot be completed.
+
+    Parameters:
+    - downstream (str): Name of the circuit breaker of the downstream service
+    - attempts (int): Maximum number of attempts per call
+    - excluded (tuple): Exception types that are neither retried nor count as downstream failures
+      (e.g. output validation, or a lookup of something that does not exist)
+    - stale (bool): Keep the last STALE_RESULTS_PER_METHOD results to fall back on. Turn it off for large
+      results or arguments (e.g. full-text papers), which the fallback would keep in memory
+    """
+    breaker = BREAKERS[downstream]
+
+    def decorator(fn):
+        results = OrderedDict()
+        stale_lock = threading.Lock()
+
+        def attempt(*args, **kwargs):
+            breaker.allow()
+            recorded = False
+            try:
+                result = fn(*args, **kwargs)
+                breaker.record_success()
+                recorded = True
+                return result
+            except excluded:
+                breaker.record_success()
+                recorded = True
+                raise
+            except Exception:
+                breaker.record_failure()
+                recorded = True
+                raise
+            finally:
+                if not recorded:  # interrupted by a BaseException, e.g. a Streamlit rerun
+                    breaker.release()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = freeze((args, kwargs)) if stale else None
+            _count(fn.__qualname__, "calls")
+
+            retrying = Retrying(
+                wait=_wait_within_deadline(wait_random_exponential(min=1, max=5)),
+                stop=stop_after_attempt(attempts) | _stop_on_deadline,
+                retry=retry_if_not_exception_type((CircuitOpenError,) + tuple(excluded)),
+                before_sleep=lambda retry_state: _count(fn.__qualname__, "retries"),
+                reraise=True)
+
+            try:
+                result = retrying(attempt, *args, **kwargs)
+            except Exception as e:
+                _count(fn.__qualname__, "short_circuited" if isinstance(e, CircuitOpenError) else "failures")
+                with stale_lock:
+                    found = key in results
+                    result = results.get(key)
+                if not found:
+                    raise
+                _count(fn.__qualname__, "stale_served")
+                logging.warning(f"{fn.__qualname__} serving stale result ({type(e).__name__}: {e})")
+                return result
+
+            if stale:
+                with stale_lock:
+                    results[key] = result
+                    results.move_to_end(key)
+                    if len(results) > STALE_RESULTS_PER_METHOD:
+                        results.popitem(last=False)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def metrics() -> dict:
+    """
+    Snapshot of the circuit breakers state and the per-method call, retry and fallback counters.
+    """
+    with _stats_lock:
+        calls = {method: dict(stats) for method, stats in _stats.items()}
+    return {"breakers": {name: breaker.snapshot() for name, breaker in BREAKERS.items()},
+            "calls": calls}
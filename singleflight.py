@@ -0,0 +1,118 @@
+import functools
+import logging
+import threading
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+        self.waiters = 0
+
+
+def _wait_timeout() -> float:
+    """
+    Seconds a waiter may wait for the leader: until the deadline of its own request, if any (see resilience.py).
+    """
+    from resilience import remaining  # resilience imports freeze from this module
+
+    left = remaining()
+    return None if left is None else max(0.0, left)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into a single in-flight call.
+    The first caller runs the function, and the callers that arrive while it is running wait for it
+    and receive the same result (or Exception). Nothing is cached once the call completes.
+    A leader interrupted by a BaseException (e.g. a Streamlit rerun of its session) does not pass it on:
+    one of its waiters takes over the call instead.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run 'fn(*args, **kwargs)' unless a call with the same key is already in flight.
+
+        Parameters:
+        - key (hashable): Identity of the call
+        - fn (callable): Function to run
+
+        Returns:
+        - Result of the (shared) call
+
+        Raises:
+        - TimeoutError: If the deadline of the caller expires while it waits for the in-flight call
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    call.waiters += 1
+
+            if leader:
+                return self.__lead(key, call, fn, *args, **kwargs)
+
+            if not call.done.wait(_wait_timeout()):
+                raise TimeoutError(f"single_flight ({getattr(fn, '__qualname__', fn)}) still in flight at the deadline")
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def __lead(self, key, call: _Call, fn, *args, **kwargs):
+        call.abandoned = True
+        try:
+            call.result = fn(*args, **kwargs)
+            call.abandoned = False
+            return call.result
+        except Exception as e:
+            call.error = e
+            call.abandoned = False
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters and not call.abandoned:
+                logging.info(f"single_flight ({getattr(fn, '__qualname__', fn)}) coalesced {call.waiters} call(s)")
+            call.done.set()
+
+
+_group = SingleFlight()
+
+
+def freeze(value):
+    """Turn call arguments (lists, dicts, ...) into a hashable key."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return tuple(sorted(freeze(v) for v in value))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def coalesce(method):
+    """
+    Decorator that coalesces concurrent identical calls of an instance method (same instance and arguments).
+    Waiters share the returned object with the leader, so callers must not mutate it.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__qualname__, id(self), freeze(args), freeze(kwargs))
+        return _group.do(key, method, self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,363 @@
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tokenbudget import count_tokens
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_page_spans = contextvars.ContextVar("page_spans", default=None)
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets (Prometheus-style).
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by linear interpolation within the bucket that contains it.
+        """
+        if not self.count:
+            return 0.0
+        rank, seen, lower = q * self.count, 0, 0.0
+        for bound, n in zip(self.buckets, self.counts):
+            if n and seen + n >= rank:
+                upper = bound if bound != float("inf") else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = bound if bound != float("inf") else lower
+        return lower
+
+
+_lock = threading.Lock()
+_latency = {}
+_counters = {}
+_startup = {}
+
+
+def _inc(metric: str, labels: tuple, n: int = 1) -> None:
+    with _lock:
+        _counters[(metric, labels)] = _counters.get((metric, labels), 0) + n
+
+
+def _texts(value) -> list:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [t for v in value for t in _texts(v)]
+    if isinstance(value, dict):
+        return [t for v in value.values() for t in _texts(v)]
+    if hasattr(value, "model_dump"):
+        return _texts(value.model_dump())
+    return []
+
+
+# -----------------------------------------------------------------------------
+# Recording API
+# -----------------------------------------------------------------------------
+
+def observe(name: str, seconds: float, outcome: str = "ok") -> None:
+    """
+    Record the latency and outcome of a call, and add it to the timing breakdown of the current page.
+    """
+    with _lock:
+        _latency.setdefault(name, Histogram()).observe(seconds)
+    _inc("calls_total", (("method", name), ("outcome", outcome)))
+
+    spans = _page_spans.get()
+    if spans is not None:
+        spans.append({"call": name, "seconds": round(seconds, 4), "outcome": outcome})
+
+
+def record_tokens(name: str, input_tokens: int = 0, output_tokens: int = 0) -> None:
+    _inc("tokens_total", (("method", name), ("direction", "input")), input_tokens)
+    _inc("tokens_total", (("method", name), ("direction", "output")), output_tokens)
+
+
+def record_budget(task: str, variant: str, prompt_tokens: int, max_tokens: int, output_tokens: int,
+                  exhausted: bool) -> None:
+    """
+    Record the token budget of a generation call: its prompt and output tokens against max_tokens.
+    Outputs that were likely cut off at max_tokens are counted as exhausted.
+    """
+    labels = (("task", task), ("variant", variant))
+    _inc("budget_calls_total", labels)
+    _inc("budget_prompt_tokens_total", labels, prompt_tokens)
+    _inc("budget_max_tokens_total", labels, max_tokens)
+    _inc("budget_output_tokens_total", labels, output_tokens)
+    if exhausted:
+        _inc("budget_exhausted_total", labels)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    _inc("cache_requests_total", (("cache", cache), ("outcome", "hit" if hit else "miss")))
+
+
+def instrument(name: str = None):
+    """
+    Decorator that records the latency histogram and outcome of every call.
+
+    Parameters:
+    - name (str): Metric name, defaults to the qualified name of the function
+    """
+    def decorator(fn):
+        metric = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                observe(metric, time.perf_counter() - start, "error")
+                raise
+            observe(metric, time.perf_counter() - start)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def meter_tokens(name: str = None):
+    """
+    Decorator that records the tokens of the text arguments and of the result (counted locally, see tokenbudget.py)
+    of every successful call. It goes under @coalesce and @resilient, next to the API call, so that
+    coalesced waiters and stale results (which made no API call) are not counted.
+
+    Parameters:
+    - name (str): Metric name, defaults to the qualified name of the function
+    """
+    def decorator(fn):
+        metric = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            record_tokens(metric,
+                          sum(count_tokens(t) for t in _texts((args, kwargs))),
+                          sum(count_tokens(t) for t in _texts(result)))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def span(name: str):
+    """
+    Context manager that records the latency of a block of code, e.g. the render of a tab.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        observe(name, time.perf_counter() - start, outcome)
+
+
+# -----------------------------------------------------------------------------
+# Page Timing Breakdown
+# -----------------------------------------------------------------------------
+
+def start_page() -> None:
+    """
+    Start collecting the timing breakdown of the current page (i.e. Streamlit script run).
+    """
+    _page_spans.set([])
+
+
+def page_breakdown() -> list:
+    """
+    Calls and spans recorded since start_page(), in completion order.
+    """
+    return list(_page_spans.get() or [])
+
+
+# -----------------------------------------------------------------------------
+# Startup Phases
+# -----------------------------------------------------------------------------
+
+def _process_start_time() -> float:
+    """
+    Wall-clock start time of this process, from /proc on Linux (10ms resolution).
+    Elsewhere, it falls back to the import time of this module.
+    """
+    try:
+        with open("/proc/self/stat", encoding="utf-8") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="utf-8") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+PROCESS_STARTED = _process_start_time()
+
+
+def mark_startup(phase: str) -> None:
+    """
+    Record when a startup phase completed, in seconds since the process started.
+    Only the first occurrence of each phase is kept, so that reruns do not overwrite the cold start.
+    """
+    with _lock:
+        _startup.setdefault(phase, round(time.time() - PROCESS_STARTED, 3))
+
+
+def startup_phases() -> dict:
+    with _lock:
+        return dict(_startup)
+
+
+# -----------------------------------------------------------------------------
+# Export
+# -----------------------------------------------------------------------------
+
+def snapshot() -> dict:
+    """
+    Snapshot of all metrics, including the circuit breakers and retry counters of the resilience layer.
+    """
+    import resilience
+
+    with _lock:
+        latency = {name: {"count": h.count, "sum": round(h.sum, 6),
+                          "p50": round(h.quantile(0.50), 6), "p95": round(h.quantile(0.95), 6),
+                          "p99": round(h.quantile(0.99), 6)}
+                   for name, h in _latency.items()}
+        counters = [{"metric": metric, **dict(labels), "value": value} for (metric, labels), value in _counters.items()]
+
+    return {"timestamp": time.time(), "latency": latency, "counters": counters, "startup": startup_phases(),
+            **resilience.metrics()}
+
+
+def to_prometheus() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+    """
+    import resilience
+
+    lines = ["# TYPE athena_call_duration_seconds histogram"]
+    with _lock:
+        for name, h in sorted(_latency.items()):
+            cumulative = 0
+            for bound, n in zip(h.buckets, h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'athena_call_duration_seconds_bucket{{method="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'athena_call_duration_seconds_sum{{method="{name}"}} {h.sum}')
+            lines.append(f'athena_call_duration_seconds_count{{method="{name}"}} {h.count}')
+
+        typed = set()
+        for (metric, labels), value in sorted(_counters.items()):
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE athena_{metric} counter")
+            rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"athena_{metric}{{{rendered}}} {value}")
+
+    phases = startup_phases()
+    if phases:
+        lines.append("# TYPE athena_startup_seconds gauge")
+        for phase, seconds in phases.items():
+            lines.append(f'athena_startup_seconds{{phase="{phase}"}} {seconds}')
+
+    health = resilience.metrics()
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    for downstream, breaker in sorted(health["breakers"].items()):
+        lines.append(f'athena_circuit_state{{downstream="{downstream}"}} {states[breaker["state"]]}')
+        lines.append(f'athena_circuit_opened_total{{downstream="{downstream}"}} {breaker["opened_total"]}')
+    for method, stats in sorted(health["calls"].items()):
+        for counter in ("retries", "short_circuited", "stale_served"):
+            lines.append(f'athena_{counter}_total{{method="{method}"}} {stats[counter]}')
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/metrics":
+            body, content_type = to_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(snapshot()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_exporter(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve the metrics at http://host:port/metrics (Prometheus) and /metrics.json (snapshot) from a daemon thread.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"Serving metrics at 'http://{host}:{port}/metrics'")
+    return server
+
+
+def start_file_exporter(filename: str, interval: float = 15.0) -> threading.Thread:
+    """
+    Write a JSON snapshot of the metrics to 'filename' every 'interval' seconds from a daemon thread.
+    """
+    def export():
+        while True:
+            time.sleep(interval)
+            try:
+                tmp_file = f"{filename}.tmp"
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    json.dump(snapshot(), f, indent=2)
+                os.replace(tmp_file, filename)
+            except OSError as e:
+                logging.warning(f"metrics_file_exporter (ERROR): {e}")
+
+    thread = threading.Thread(target=export, name="metrics-file", daemon=True)
+    thread.start()
+    logging.info(f"Writing metrics to '{filename}' every {interval}s")
+    return thread
+
+
+def start_exporters_from_env() -> None:
+    """
+    Start the exporters configured by the ATHENA_METRICS_PORT and ATHENA_METRICS_FILE environment variables.
+    """
+    port = os.getenv("ATHENA_METRICS_PORT")
+    filename = os.getenv("ATHENA_METRICS_FILE")
+    try:
+        if port:
+            start_http_exporter(int(port))
+        if filename:
+            start_file_exporter(filename, float(os.getenv("ATHENA_METRICS_INTERVAL", "15")))
+    except (OSError, ValueError) as e:
+        logging.warning(f"Metrics exporter not started: {e}")
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from benchmarks import synthetic
+from benchmarks.stubs import StubCohereEngine
+from data_pipeline import enrich_arxiv
+from data_pipeline.index_metadata import build_index
+from enrichmentstore import EnrichmentStore
+from metadatastore import MetadataStore
+from resilience import BREAKERS
+
+
+class EnrichCorpusTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.breaker = BREAKERS["cohere-generate"]
+        self.breaker.record_success()
+        self.reset_timeout, self.breaker.reset_timeout = self.breaker.reset_timeout, 0
+        self.patches = [mock.patch.dict(os.environ, {"ATHENA_STUB_COHERE_LATENCY": "0"}),
+                        mock.patch("time.sleep")]  # retry backoff and circuit waits
+        for patch in self.patches:
+            patch.start()
+        self.engine = StubCohereEngine()
+        self.enrichments = EnrichmentStore(os.path.join(self.tmp.name, "arxiv_enrichments.db"))
+
+    def tearDown(self) -> None:
+        for patch in self.patches:
+            patch.stop()
+        self.breaker.reset_timeout = self.reset_timeout
+        self.breaker.record_success()
+        self.tmp.cleanup()
+
+    def metadata_store(self, papers: list) -> MetadataStore:
+        filename = os.path.join(self.tmp.name, "arxiv_cs.json")
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(papers, f)
+        db_file = os.path.join(self.tmp.name, "arxiv_metadata.db")
+        build_index([filename], db_file)
+        return MetadataStore(db_file)
+
+    def test_run_resumes_from_stored_results(self) -> None:
+        store = self.metadata_store([synthetic.paper(i) for i in range(5)])
+        arxiv_id = next(store.iter_all())[0]
+        version = enrich_arxiv.prompt_version(self.engine, "abstract")
+        self.enrichments.put_many([(arxiv_id, "abstract", "stored", version)])
+
+        self.assertEqual(enrich_arxiv.enrich_corpus(self.engine, store, self.enrichments),
+                         (5 * len(enrich_arxiv.TASKS) - 1, 0))
+        self.assertEqual(self.enrichments.get(arxiv_id, "abstract"), "stored")
+        self.assertEqual(enrich_arxiv.enrich_corpus(self.engine, store, self.enrichments), (0, 0))
+
+    @mock.patch.object(enrich_arxiv, "TASKS", ["summary"])
+    def test_jobs_short_circuited_by_the_open_circuit_are_requeued(self) -> None:
+        store = self.metadata_store([synthetic.paper(i) for i in range(100, 110)])
+        summarize = self.engine.cohere.summarize
+        outage = iter([ConnectionError("503")] * 8)
+
+        def flaky(text, **kwargs):
+            error = next(outage, None)
+            if error:
+                raise error
+            return summarize(text, **kwargs)
+
+        with mock.patch.object(self.engine.cohere, "summarize", side_effect=flaky):
+            done, failed = enrich_arxiv.enrich_corpus(self.engine, store, self.enrichments)
+
+        self.assertLessEqual(failed, 2)  # only jobs whose every attempt reached the API
+        self.assertEqual(done + failed, 10)
+        self.assertEqual(len(self.enrichments.completed("summary")), done)
+
+    @mock.patch.object(enrich_arxiv, "TASKS", ["summary"])
+    def test_run_stops_on_a_sustained_outage(self) -> None:
+        store = self.metadata_store([synthetic.paper(i) for i in range(200, 210)])
+
+        with mock.patch.object(self.engine.cohere, "summarize", side_effect=ConnectionError("503")) as summarize:
+            done, _ = enrich_arxiv.enrich_corpus(self.engine, store, self.enrichments)
+
+        self.assertEqual(done, 0)
+        # the limit is checked between batches, and reset_timeout=0 lets a trial through after every failure
+        self.assertGreaterEqual(summarize.call_count, enrich_arxiv.MAX_CONSECUTIVE_FAILURES)
+        self.assertLess(summarize.call_count, 2 * enrich_arxiv.MAX_CONSECUTIVE_FAILURES)
+
+
+if __name__ == "__main__":
+    unittest.main()
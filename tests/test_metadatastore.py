@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks import synthetic
+from data_pipeline.index_metadata import build_index
+from metadatastore import MetadataStore
+from papercache import split_arxiv_id
+
+
+def with_version(paper: dict, version: int, title: str) -> dict:
+    base_id, _ = split_arxiv_id(paper["id"])
+    return {**paper, "id": f"http://arxiv.org/abs/{base_id}v{version}", "title": title}
+
+
+class MetadataIndexTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.corpus = synthetic.corpus(50)
+        self.first = self.corpus[3]   # harvested as v1
+        self.second = self.corpus[5]  # harvested as v3
+
+        harvests = [self.corpus + [with_version(self.first, 1, "First v1"), with_version(self.second, 3, "Second v3")],
+                    [with_version(self.first, 2, "First v2"), with_version(self.second, 2, "Second v2")]]
+        filenames = []
+        for i, papers in enumerate(harvests):
+            filenames.append(os.path.join(self.tmp.name, f"arxiv_cs{i}.json"))
+            with open(filenames[-1], "w", encoding="utf-8") as f:
+                json.dump(papers, f)
+
+        self.db_file = os.path.join(self.tmp.name, "arxiv_metadata.db")
+        self.count = build_index(filenames, self.db_file)
+        self.store = MetadataStore(self.db_file)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_every_paper_is_indexed_once(self) -> None:
+        self.assertEqual(self.count, len({split_arxiv_id(p["id"])[0] for p in self.corpus}))
+        self.assertEqual(len(list(self.store.iter_all())), self.count)
+
+    def test_upsert_keeps_the_newer_version(self) -> None:
+        self.assertEqual(self.store.get(split_arxiv_id(self.first["id"])[0])["Title"], "First v2")
+        self.assertEqual(self.store.get(self.second["id"])["Title"], "Second v3")  # version suffix ignored
+
+    def test_unknown_paper(self) -> None:
+        self.assertIsNone(self.store.get("9999.99999"))
+
+    def test_authors_are_split(self) -> None:
+        paper = self.corpus[0]
+        for author in paper["authors"].split(", "):
+            entry_ids = [p["entry_id"] for p in self.store.find_by_author(author.upper(), limit=100)]
+            self.assertIn(paper["id"], entry_ids)
+
+    def test_prefix_range(self) -> None:
+        prefix = split_arxiv_id(self.corpus[0]["id"])[0][:5]  # YYMM.
+        found = [split_arxiv_id(p["entry_id"])[0] for p in self.store.find_by_prefix(prefix, limit=100)]
+        expected = sorted({base_id for base_id, _ in (split_arxiv_id(p["id"]) for p in self.corpus)
+                           if base_id.startswith(prefix)})
+        self.assertTrue(expected)
+        self.assertEqual(found, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
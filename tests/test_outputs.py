@@ -0,0 +1,27 @@
+import pickle
+import subprocess
+import sys
+import unittest
+
+import coral
+
+
+class OutputModelsTest(unittest.TestCase):
+
+    def test_models_pickle_round_trip(self) -> None:
+        for output in (coral.Tweet(text="Read more: https://arxiv.org/abs/1810.04805"),
+                       coral.Email(subject="Collaboration", body="Dear authors, ...")):
+            self.assertEqual(pickle.loads(pickle.dumps(output)), output)
+
+    def test_tweet_requires_a_link(self) -> None:
+        with self.assertRaises(ValueError):
+            coral.Tweet(text="A tweet without link")
+
+    def test_models_are_imported_on_first_use(self) -> None:
+        code = "import sys, coral; print('pydantic' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+
+from unittest import mock
+
+from benchmarks import synthetic
+from papercache import PaperCache, PaperPrefetcher, split_arxiv_id
+
+
+def metadata(i: int, version: int = None) -> dict:
+    paper = synthetic.paper(i)
+    entry_id = paper["id"] if version is None else f"{paper['id'].rsplit('v', 1)[0]}v{version}"
+    return {"entry_id": entry_id, "Title": paper["title"], "Authors": paper["authors"], "Summary": paper["summary"]}
+
+
+class SplitArxivIdTest(unittest.TestCase):
+
+    def test_versioned_and_unversioned_ids(self) -> None:
+        self.assertEqual(split_arxiv_id("1810.04805"), ("1810.04805", None))
+        self.assertEqual(split_arxiv_id("http://arxiv.org/abs/1810.04805v2"), ("1810.04805", 2))
+
+    def test_empty_id_is_rejected(self) -> None:
+        for paper_id in ("", "  "):
+            with self.assertRaises(ValueError):
+                split_arxiv_id(paper_id)
+
+
+class PaperCacheTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = PaperCache(cache_dir=self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_unversioned_id_resolves_to_the_latest_version(self) -> None:
+        for version in (1, 3, 2):
+            self.cache.put(metadata(0, version), f"content v{version}")
+        base_id = split_arxiv_id(metadata(0)["entry_id"])[0]
+
+        self.assertEqual(self.cache.get(base_id)[1], "content v3")
+        self.assertEqual(self.cache.get(f"{base_id}v2")[1], "content v2")
+        self.assertIsNone(self.cache.get(f"{base_id}v4"))
+        self.assertIn(base_id, self.cache)
+
+    def test_least_recently_used_entries_are_evicted(self) -> None:
+        papers = [metadata(i) for i in range(3)]
+        for i, paper in enumerate(papers):
+            self.cache.put(paper, "x" * 1000)
+            path = os.path.join(self.tmp.name, os.path.basename(paper["entry_id"]) + ".json")
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))  # put in order 0, 1, 2
+
+        self.cache.get(papers[0]["entry_id"])  # 0 becomes the most recently used
+        self.cache.max_bytes = 3 * os.path.getsize(path)
+        self.cache.put(metadata(3), "x" * 1000)
+
+        self.assertIn(papers[0]["entry_id"], self.cache)
+        self.assertNotIn(papers[1]["entry_id"], self.cache)
+        self.assertIn(papers[2]["entry_id"], self.cache)
+        self.assertIn(metadata(3)["entry_id"], self.cache)
+
+
+class PaperPrefetcherTest(unittest.TestCase):
+
+    def test_cached_papers_are_not_downloaded(self) -> None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PaperCache(cache_dir=cache_dir)
+            cache.put(metadata(0), "content")
+            loader = mock.Mock()
+            prefetcher = PaperPrefetcher(loader=loader, cache=cache)
+
+            prefetcher.prefetch([metadata(0)["entry_id"], metadata(1)["entry_id"]])
+            prefetcher._executor.shutdown(wait=True)
+
+        loader.assert_called_once_with(metadata(1)["entry_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import time
+import unittest
+
+from unittest import mock
+
+import coral
+import resilience
+
+from chains import ChainRegistry
+from cohere.error import CohereAPIError
+from resilience import BREAKERS, CircuitBreaker, CircuitOpenError, RateLimitedClient, deadline, resilient
+
+
+class HalfOpenTrialTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.breaker = BREAKERS["test"] = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+        self.calls = []
+
+        @resilient("test", attempts=1)
+        def call(outcome):
+            self.calls.append(outcome)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+
+        self.call = call
+
+    def tearDown(self) -> None:
+        del BREAKERS["test"]
+
+    def open_circuit(self) -> None:
+        with self.assertRaises(ConnectionError):
+            self.call(ConnectionError("down"))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        time.sleep(0.02)
+
+    def test_trial_runs_past_the_deadline(self) -> None:
+        self.open_circuit()
+        with deadline(0):
+            self.assertEqual(self.call("ok"), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_interrupted_trial_is_released(self) -> None:
+        self.open_circuit()
+        with self.assertRaises(KeyboardInterrupt):
+            self.call(KeyboardInterrupt())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.assertEqual(self.call("ok"), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_single_trial_while_half_open(self) -> None:
+        self.open_circuit()
+        self.breaker.allow()
+        with self.assertRaises(CircuitOpenError):
+            self.call("concurrent")
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_deadline_caps_retries_not_the_first_attempt(self) -> None:
+        BREAKERS["test"] = CircuitBreaker("test")
+        calls = []
+
+        @resilient("test", attempts=3)
+        def call():
+            calls.append(time.monotonic())
+            raise ConnectionError("down")
+
+        try:
+            with deadline(0):
+                with self.assertRaises(ConnectionError):
+                    call()
+        finally:
+            del BREAKERS["test"]
+        self.assertEqual(len(calls), 1)
+
+    def test_start_deadline_replaces_an_expired_one(self) -> None:
+        token = resilience.start_deadline(0)
+        try:
+            resilience.start_deadline(10)
+            self.assertGreater(resilience.remaining(), 9)
+            with deadline(1):
+                self.assertLessEqual(resilience.remaining(), 1)
+        finally:
+            resilience._deadline.reset(token)
+
+
+class ArxivNotFoundTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.breaker = BREAKERS["arxiv"]
+        self.breaker.record_success()
+        self.engine = coral.CohereEngine.__new__(coral.CohereEngine)
+
+    def test_unknown_ids_do_not_open_the_circuit(self) -> None:
+        with mock.patch("langchain.document_loaders.ArxivLoader") as loader:
+            loader.return_value.load.return_value = []
+            for paper_id in ["1810.0480", "9999.99999"]:  # 2 x 3 attempts would exceed the failure threshold
+                with self.assertRaises(LookupError):
+                    self.engine._CohereEngine__download_arxiv_paper(paper_id)
+
+            self.assertEqual(loader.call_count, 2)  # not retried
+            self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+            self.assertEqual(self.breaker.failures, 0)
+
+
+class RateLimitedClientTest(unittest.TestCase):
+
+    def test_retries_acquire_the_limiter(self) -> None:
+        BREAKERS["test"] = CircuitBreaker("test")
+        limiter = mock.Mock()
+        client = RateLimitedClient(mock.Mock(max_retries=3), limiter)
+        client._client.generate.side_effect = [ConnectionError("429"), ConnectionError("429"), "ok"]
+
+        @resilient("test", attempts=3)
+        def generate():
+            return client.generate(prompt="...")
+
+        try:
+            with mock.patch("time.sleep"):  # retry backoff
+                self.assertEqual(generate(), "ok")
+        finally:
+            del BREAKERS["test"]
+        self.assertEqual(limiter.acquire.call_count, 3)
+        self.assertEqual(client.max_retries, 0)  # no unlimited retries within the client
+
+
+class PooledModelRetriesTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        BREAKERS["cohere-generate"].record_success()
+        self.engine = coral.CohereEngine.__new__(coral.CohereEngine)
+        with mock.patch.dict(os.environ, {"COHERE_API_KEY": "test"}):
+            self.engine.chains = ChainRegistry(output_models=coral._models())
+            self.llm = self.engine.chains.model()
+
+    def tearDown(self) -> None:
+        BREAKERS["cohere-generate"].record_success()
+
+    def test_llm_errors_are_retried_by_resilient_only(self) -> None:
+        with mock.patch.object(self.llm, "client") as client, mock.patch("time.sleep"):
+            client.generate.side_effect = CohereAPIError("503")
+            with self.assertRaises(CohereAPIError):
+                self.engine.enrich_abstract(text="An abstract that the model fails to enrich.")
+
+        self.assertEqual(client.generate.call_count, 3)  # the attempts of @resilient
+        self.assertEqual(self.llm.client.max_retries, 0)  # no HTTP retries within an attempt
+
+
+if __name__ == "__main__":
+    unittest.main()
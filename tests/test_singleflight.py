@@ -0,0 +1,89 @@
+import threading
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from resilience import deadline
+from singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.group = SingleFlight()
+        self.release = threading.Event()
+        self.calls = []
+
+    def blocking(self, outcome):
+        """Function that records its call and blocks until released, then returns or raises 'outcome'."""
+        self.calls.append(outcome)
+        self.release.wait(5)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def wait_for_waiters(self, key, n: int) -> None:
+        for _ in range(500):
+            call = self.group._calls.get(key)
+            if call is not None and call.waiters >= n:
+                return
+            time.sleep(0.01)
+        self.fail(f"{n} waiters never joined the call")
+
+    def run_concurrently(self, n: int, fn):
+        executor = ThreadPoolExecutor(max_workers=n)
+        futures = [executor.submit(self.group.do, "key", fn) for _ in range(n)]
+        self.wait_for_waiters("key", n - 1)
+        self.release.set()
+        executor.shutdown(wait=True)
+        return futures
+
+    def test_concurrent_calls_are_coalesced(self) -> None:
+        futures = self.run_concurrently(4, lambda: self.blocking(object()))
+
+        results = [future.result() for future in futures]
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.group._calls, {})
+
+    def test_exceptions_are_shared(self) -> None:
+        error = ConnectionError("down")
+        futures = self.run_concurrently(3, lambda: self.blocking(error))
+
+        for future in futures:
+            self.assertIs(future.exception(), error)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.group._calls, {})
+
+    def test_interrupted_leader_is_replaced_by_a_waiter(self) -> None:
+        outcomes = iter([KeyboardInterrupt(), "ok", "ok"])
+        futures = self.run_concurrently(3, lambda: self.blocking(next(outcomes)))
+
+        interrupted = [future for future in futures if isinstance(future.exception(), KeyboardInterrupt)]
+        self.assertEqual(len(interrupted), 1)  # only the leader's own caller
+        self.assertEqual([future.result() for future in futures if future not in interrupted], ["ok", "ok"])
+        self.assertEqual(self.group._calls, {})
+
+    def test_calls_after_completion_are_not_coalesced(self) -> None:
+        self.release.set()
+        self.assertEqual(self.group.do("key", self.blocking, 1), 1)
+        self.assertEqual(self.group.do("key", self.blocking, 2), 2)
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_waiters_stop_waiting_at_their_deadline(self) -> None:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            leader = executor.submit(self.group.do, "key", self.blocking, "ok")
+            while "key" not in self.group._calls:
+                time.sleep(0.01)
+            try:
+                with deadline(0.05), self.assertRaises(TimeoutError):
+                    self.group.do("key", self.blocking, "ok")
+            finally:
+                self.release.set()
+            self.assertEqual(leader.result(), "ok")
+        self.assertEqual(self.calls, ["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import unittest
+
+from types import SimpleNamespace
+from unittest import mock
+
+import coral
+import telemetry
+import tokenbudget
+
+from chains import ChainRegistry
+from resilience import BREAKERS
+
+
+def response(text: str, finish_reason: str):
+    return SimpleNamespace(generations=[SimpleNamespace(text=text, finish_reason=finish_reason)])
+
+
+class TruncationTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        BREAKERS["cohere-generate"].record_success()
+        self.engine = coral.CohereEngine.__new__(coral.CohereEngine)
+        with mock.patch.dict(os.environ, {"COHERE_API_KEY": "test"}):
+            self.engine.chains = ChainRegistry(output_models=coral._models())
+        self.client = self.engine.chains.model().client._client = mock.Mock()
+
+    def enrich(self, text: str) -> str:
+        return self.engine._CohereEngine__generate("abstract", {"text": text}, text)
+
+    def test_output_near_max_tokens_is_not_truncated_when_complete(self) -> None:
+        self.client.generate.return_value = response("[Link](https://en.wikipedia.org/wiki/Link) " * 200, "COMPLETE")
+        self.enrich("A short abstract.")
+        self.assertEqual(self.client.generate.call_count, 1)
+
+    def test_output_cut_off_is_regenerated_with_a_larger_budget(self) -> None:
+        self.client.generate.side_effect = [response("Cut", "MAX_TOKENS"), response("Complete", "COMPLETE")]
+        self.assertEqual(self.enrich("A short abstract."), "Complete")
+        first, second = (call.kwargs["max_tokens"] for call in self.client.generate.call_args_list)
+        self.assertGreater(second, first)
+
+    def test_output_still_cut_off_is_rejected(self) -> None:
+        self.client.generate.return_value = response("Cut", "MAX_TOKENS")
+        with self.assertRaises(tokenbudget.TruncatedOutput):
+            self.enrich("A short abstract.")
+
+    def test_every_api_call_is_metered_with_its_prompt(self) -> None:
+        def metered(direction: str) -> int:
+            labels = (("method", "CohereEngine.enrich_abstract"), ("direction", direction))
+            return telemetry._counters.get(("tokens_total", labels), 0)
+
+        text = "An abstract whose enrichment is cut off once."
+        budget = tokenbudget.plan("abstract", self.engine.chains, {"text": text}, text)
+        self.client.generate.side_effect = [response("Cut", "MAX_TOKENS"), response("Complete", "COMPLETE")]
+        before = metered("input"), metered("output")
+        self.engine.enrich_abstract(text=text)
+
+        self.assertEqual(metered("input") - before[0], 2 * budget.prompt_tokens)
+        self.assertGreater(budget.prompt_tokens, tokenbudget.count_tokens(text))
+        self.assertEqual(metered("output") - before[1],
+                         tokenbudget.count_tokens("Cut") + tokenbudget.count_tokens("Complete"))
+
+    def test_abstract_budget_covers_its_links(self) -> None:
+        words = ["We", "train", "a", "neural", "network", "on", "text", "and", "images"] * 20  # 180 words
+        abstract = " ".join(words)
+        link = "[neural network](https://en.wikipedia.org/wiki/Artificial_neural_network)"
+        rewritten = " ".join(link if i % 15 == 0 else word for i, word in enumerate(words))  # 12 links
+        budget = tokenbudget.plan("abstract", self.engine.chains, {"text": abstract}, abstract)
+        self.assertFalse(tokenbudget.truncated(budget, rewritten))
+
+    def test_max_tokens_takes_few_distinct_values(self) -> None:
+        words = ["We", "train", "a", "neural", "network", "on", "text", "and", "images"] * 200
+        for task in ("abstract", "keywords"):
+            budgets = [tokenbudget.plan(task, self.engine.chains, {"text": text}, text)
+                       for text in (" ".join(words[:n]) for n in range(1, len(words), 7))]
+            sizes = {budget.max_tokens for budget in budgets} | \
+                {larger.max_tokens for larger in map(tokenbudget.enlarge, budgets) if larger}
+
+            self.assertTrue(all(size % tokenbudget.MAX_TOKENS_STEP == 0 for size in sizes))
+            self.assertLessEqual(len(sizes), tokenbudget.CONTEXT_WINDOW // tokenbudget.MAX_TOKENS_STEP)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from weaviatestore import CATEGORIES, WeaviateStore, class_name_for, partitions_of
+
+
+def paper(arxiv_id: str, **additional) -> dict:
+    return {"url": f"http://arxiv.org/abs/{arxiv_id}v1", "title": arxiv_id, "_additional": additional}
+
+
+class FixedQuery:
+    """
+    Get query of a partition class, answered with fixed results (whatever the search operator).
+    """
+
+    def __init__(self, class_name: str, results: list) -> None:
+        self.class_name = class_name
+        self.results = results
+        self.limit = None
+
+    def with_limit(self, limit: int):
+        self.limit = limit
+        return self
+
+    def with_additional(self, properties: list):
+        return self
+
+    def with_near_vector(self, content: dict):
+        return self
+
+    def with_bm25(self, query: str, **kwargs):
+        return self
+
+    def with_hybrid(self, query: str, **kwargs):
+        return self
+
+    def do(self) -> dict:
+        return {"data": {"Get": {self.class_name: [{**obj, "_additional": dict(obj["_additional"])}
+                                                   for obj in self.results[:self.limit]]}}}
+
+
+class PartitionMergeTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.results = {}
+
+        def get(class_name, properties):
+            return FixedQuery(class_name, self.results.get(class_name, []))
+
+        self.store = WeaviateStore.__new__(WeaviateStore)
+        self.store.weaviate = SimpleNamespace(query=SimpleNamespace(get=get))
+        self.store.partitions = ThreadPoolExecutor(max_workers=len(CATEGORIES))
+
+    def tearDown(self) -> None:
+        self.store.partitions.shutdown()
+
+    def titles(self, df) -> list:
+        return list(df["title"])
+
+    def test_vector_search_merges_by_distance(self) -> None:
+        self.results = {class_name_for("cs.CL"): [paper("a", distance=0.10), paper("c", distance=0.30)],
+                        class_name_for("cs.LG"): [paper("b", distance=0.20), paper("d", distance=0.40)]}
+
+        df = self.store.query_with_near_vector([0.1, 0.2], max_results=3, categories=("cs.CL", "cs.LG"))
+        self.assertEqual(self.titles(df), ["a", "b", "c"])
+
+    def test_keyword_search_interleaves_by_rank(self) -> None:
+        # cs.CL scores are higher throughout, but rank 1 of every partition comes before any rank 2
+        self.results = {class_name_for("cs.CL"): [paper("a", score="9.0"), paper("b", score="8.0")],
+                        class_name_for("cs.LG"): [paper("c", score="2.0"), paper("d", score="1.0")]}
+
+        for query in (self.store.query_with_bm25, self.store.query_with_hybrid):
+            df = query("transformers", max_results=4, categories=("cs.CL", "cs.LG"))
+            self.assertEqual(self.titles(df), ["a", "c", "b", "d"])
+            self.assertEqual([obj["rank"] for obj in df["_additional"]], [1, 1, 2, 2])
+
+    def test_cross_listed_paper_is_kept_once(self) -> None:
+        self.results = {class_name_for("cs.CL"): [paper("a", distance=0.10), paper("x", distance=0.30)],
+                        class_name_for("cs.LG"): [paper("x", distance=0.20), paper("b", distance=0.40)]}
+
+        df = self.store.query_with_near_vector([0.3, 0.4], max_results=3, categories=("cs.CL", "cs.LG"))
+        self.assertEqual(self.titles(df), ["a", "x", "b"])  # at its best position
+        self.assertEqual(df.iloc[1]["_additional"]["distance"], 0.20)
+
+    def test_empty_category_scope_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            self.store.query_with_near_vector([0.5, 0.6], categories=())
+
+
+class PartitionsOfTest(unittest.TestCase):
+
+    def test_listed_categories(self) -> None:
+        self.assertEqual(partitions_of("cs.CL, cs.LG"), ["cs.CL", "cs.LG"])
+
+    def test_unknown_categories_are_ignored(self) -> None:
+        self.assertEqual(partitions_of("stat.ML, cs.LG, math.OC"), ["cs.LG"])
+
+    def test_duplicate_categories_are_kept_once(self) -> None:
+        self.assertEqual(partitions_of("cs.CL,cs.LG, cs.CL"), ["cs.CL", "cs.LG"])
+
+    def test_no_known_category_falls_back_to_the_first_partition(self) -> None:
+        for categories in ("stat.ML, math.OC", "", None):
+            self.assertEqual(partitions_of(categories), [CATEGORIES[0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
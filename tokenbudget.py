@@ -0,0 +1,163 @@
+import contextlib
+import contextvars
+import logging
+import math
+import re
+
+from collections import namedtuple
+
+CONTEXT_WINDOW = 4096  # Cohere 'command': prompt and generation tokens
+COMPACT_MAX_INPUT_TOKENS = 300  # Inputs up to this size use the compact prompt variant, if the task has one
+TRUNCATED_RATIO = 0.95  # Outputs of at least this share of max_tokens (counted locally) were likely cut off
+MAX_TOKENS_STEP = 256  # max_tokens is rounded to multiples of this, so that few distinct chains are bound per task
+MAX_TOKENS = "MAX_TOKENS"  # Finish reason of the Cohere generate API for generations cut off at max_tokens
+
+# Expected output size of every task: base + ratio * input tokens, within [min, max]
+BUDGETS = {
+    "abstract": {"base": 512, "ratio": 2.0, "min": 512, "max": 2048},  # the input, with ~26 tokens per markdown link
+    "keywords": {"base": 512, "ratio": 0.75, "min": 512, "max": 1536},  # a glossary of about 10 terms, with explanations
+    "tweet": {"base": 250, "ratio": 0.0, "min": 250, "max": 250},
+    "email": {"base": 500, "ratio": 0.0, "min": 500, "max": 500},
+}
+
+# Pre-tokenization as in BPE tokenizers: words, numbers, punctuation and line breaks (with their indentation)
+_PIECES = re.compile(r"[^\W\d_]+|\d+|\n\s*|[^\w\s]|_")
+
+Budget = namedtuple("Budget", ["task", "variant", "input_tokens", "prompt_tokens", "max_tokens"])
+
+_finish_reasons = contextvars.ContextVar("finish_reasons", default=None)
+
+
+class TruncatedOutput(ValueError):
+    """
+    Raised when a generation is cut off at max_tokens, even with an enlarged budget.
+    """
+
+
+def count_tokens(text: str) -> int:
+    """
+    Local approximation of the Cohere tokenizer (BPE), without an API call: a word counts as one token
+    per 7 characters, a number as one per 3 digits, and punctuation and line breaks as one each.
+    Whitespace between words is merged into the following word, as BPE vocabularies do.
+
+    Parameters:
+    - text (str): Text to count
+
+    Returns:
+    - int: Approximate number of tokens
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        if piece.isalpha():
+            tokens += math.ceil(len(piece) / 7)
+        elif piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+def plan(task: str, chains, inputs: dict, text: str) -> Budget:
+    """
+    Choose the prompt variant and size max_tokens of a generation call.
+    The compact variant (without the few-shot example) is used for short inputs, and max_tokens is sized
+    to the expected output of the task (rounded up to a multiple of MAX_TOKENS_STEP), and capped so that prompt
+    and generation fit in CONTEXT_WINDOW.
+
+    Parameters:
+    - task (str): Task of the ChainRegistry
+    - chains (ChainRegistry): Registry with the prompt templates
+    - inputs (dict): Variables of the prompt
+    - text (str): Input the output size scales with (e.g. the abstract)
+
+    Returns:
+    - Budget: Prompt variant, token counts and max_tokens
+    """
+    input_tokens = count_tokens(text)
+    variant = "compact" if input_tokens <= COMPACT_MAX_INPUT_TOKENS and chains.has_variant(task, "compact") \
+        else "default"
+    prompt_tokens = count_tokens(chains.prompt(task, variant).format(**inputs))
+
+    budget = BUDGETS[task]
+    expected = max(budget["min"], budget["base"] + math.ceil(budget["ratio"] * input_tokens))
+    max_tokens = min(budget["max"], _round(expected, math.ceil))
+    if prompt_tokens + max_tokens > CONTEXT_WINDOW:
+        logging.warning(f"{task}: prompt of ~{prompt_tokens} tokens leaves less than {max_tokens} tokens to generate")
+        max_tokens = max(budget["min"], _round(CONTEXT_WINDOW - prompt_tokens, math.floor))
+
+    return Budget(task, variant, input_tokens, prompt_tokens, max_tokens)
+
+
+def _round(tokens: int, rounding) -> int:
+    return rounding(tokens / MAX_TOKENS_STEP) * MAX_TOKENS_STEP
+
+
+def enlarge(budget: Budget) -> Budget:
+    """
+    Budget to regenerate a truncated output with: twice max_tokens, within CONTEXT_WINDOW.
+
+    Returns:
+    - Budget: Larger budget, or None if max_tokens cannot grow
+    """
+    max_tokens = min(2 * budget.max_tokens, _round(CONTEXT_WINDOW - budget.prompt_tokens, math.floor))
+    return budget._replace(max_tokens=max_tokens) if max_tokens > budget.max_tokens else None
+
+
+def output_tokens(output) -> int:
+    text = output.model_dump_json() if hasattr(output, "model_dump_json") else str(output)
+    return count_tokens(text)
+
+
+def truncated(budget: Budget, output, finish_reason: str = None) -> bool:
+    """
+    Whether an output was cut off at max_tokens. The finish reason reported by the API decides; without one
+    (e.g. a stand-in LLM), an output that filled its max_tokens (counted locally) was likely cut off.
+    """
+    if finish_reason is not None:
+        return finish_reason == MAX_TOKENS
+    return output_tokens(output) >= TRUNCATED_RATIO * budget.max_tokens
+
+
+class FinishReasonClient:
+    """
+    Proxy of a Cohere client that reports the finish reason of its generations to the enclosing
+    finish_reasons() block, since the langchain LLM only returns the generated text.
+    """
+
+    def __init__(self, client) -> None:
+        self._client = client
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+    def generate(self, *args, **kwargs):
+        response = self._client.generate(*args, **kwargs)
+        reasons = _finish_reasons.get()
+        if reasons is not None:
+            reasons.append(response.generations[0].finish_reason)  # the generation the langchain LLM returns
+        return response
+
+
+@contextlib.contextmanager
+def finish_reasons():
+    """
+    Context manager that collects the finish reasons of the generations made within it (see FinishReasonClient).
+    """
+    reasons = []
+    token = _finish_reasons.set(reasons)
+    try:
+        yield reasons
+    finally:
+        _finish_reasons.reset(token)
+
+
+def record(budget: Budget, output, finish_reason: str = None) -> None:
+    """
+    Report the budget of a call and the tokens it used to telemetry.
+    """
+    import telemetry
+
+    telemetry.record_budget(budget.task, budget.variant, budget.prompt_tokens, budget.max_tokens,
+                            output_tokens(output), truncated(budget, output, finish_reason))
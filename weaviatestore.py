@@ -1,10 +1,43 @@
+from __future__ import annotations
+
 import logging
 import os
-import pandas as pd
-import weaviate
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from resilience import resilient
+from singleflight import coalesce
+from telemetry import instrument, observe
 from tenacity import retry, stop_after_attempt, wait_random_exponential
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pandas and weaviate are imported on first use, to keep the app's cold start short
+    import pandas as pd
+
+CLASS_PREFIX = "ArxivDocument"
+CATEGORIES = ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "cs.MA", "cs.NE"]  # as harvested by retrieve_arxiv.py
+FIELDS = ["url", "url_pdf", "title", "authors", "categories", "abstract", "update_date", "publication_date"]
+
+MAX_CONCURRENT_SEARCHES = 16  # across all sessions; each search runs one query per selected partition
+PARTITION_WORKERS = MAX_CONCURRENT_SEARCHES * len(CATEGORIES)
+
+
+def class_name_for(category: str) -> str:
+    """
+    Weaviate class of a category partition (see data_pipeline/index_arxiv.py), e.g. 'cs.CL' -> 'ArxivDocument_CS_CL'.
+    """
+    return f"{CLASS_PREFIX}_{category.replace('.', '_').upper()}"
+
+
+def partitions_of(categories: str) -> list:
+    """
+    Category partitions of a paper: all of its listed categories among the harvested CATEGORIES
+    (the first of CATEGORIES if none is), so that cross-listed papers are found in every category scope.
+    """
+    listed = [c.strip() for c in (categories or "").split(",")]
+    return list(dict.fromkeys(c for c in listed if c in CATEGORIES)) or [CATEGORIES[0]]
 
 
 class WeaviateStore:
@@ -16,84 +49,113 @@ class WeaviateStore:
         self.weaviate = self.__weaviate_client(self.vars["COHERE_API_KEY"],
                                                self.vars["WEAVIATE_URL"],
                                                self.vars["WEAVIATE_API_KEY"])
+        # Shared by all sessions (threads are only started on demand)
+        self.partitions = ThreadPoolExecutor(max_workers=PARTITION_WORKERS, thread_name_prefix="weaviate-partition")
 
         logging.info("Initialized WeaviateEngine")
 
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
-    def query_with_near_text(self, query, max_results=10) -> pd.DataFrame:
+    @instrument()
+    @coalesce
+    @resilient("weaviate")
+    def query_with_near_text(self, query, max_results=10, categories=None, class_name=None) -> pd.DataFrame:
         """
         Search Arxiv Documents in Weaviate with Near Text.
         Weaviate converts the input query into a vector through the inference API (Cohere) and uses that vector as the basis for a vector search.
+        The query is vectorized once per searched partition: to search several partitions, embed the query once
+        (CohereEngine.embed with input_type='search_query') and use query_with_near_vector instead.
         """
+        return self.__search(lambda q: q.with_near_text({"concepts": [query]}), "distance",
+                             max_results, categories, class_name)
 
-        response = (
-            self.weaviate.query
-            .get("ArxivDocument_CS_CL", ["url", "url_pdf", "title", "authors", "categories", "abstract", "update_date", "publication_date"])
-            .with_near_text({"concepts": [query]})
-            .with_limit(max_results)
-            .do()
-        )
-
-        data = response["data"]["Get"]["ArxivDocument_CS_CL"]
-        return pd.DataFrame.from_dict(data, orient='columns')
-
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
-    def query_with_near_vector(self, query_vector, max_results=10) -> pd.DataFrame:
+    @instrument()
+    @coalesce
+    @resilient("weaviate")
+    def query_with_near_vector(self, query_vector, max_results=10, categories=None, class_name=None) -> pd.DataFrame:
         """
         Search Arxiv Documents in Weaviate with Near Vector.
         Weaviate uses that vector query as the basis for the search.
         """
+        return self.__search(lambda q: q.with_near_vector({"vector": query_vector}), "distance",
+                             max_results, categories, class_name)
 
-        response = (
-            self.weaviate.query
-            .get("ArxivDocument_CS_CL", ["url", "url_pdf", "title", "authors", "categories", "abstract", "update_date", "publication_date"])
-            .with_near_vector({"vector": query_vector})
-            .with_limit(max_results)
-            .do()
-        )
-
-        data = response["data"]["Get"]["ArxivDocument_CS_CL"]
-        return pd.DataFrame.from_dict(data, orient='columns')
-
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
-    def query_with_bm25(self, query, max_results=10) -> pd.DataFrame:
+    @instrument()
+    @coalesce
+    @resilient("weaviate")
+    def query_with_bm25(self, query, max_results=10, categories=None, class_name=None) -> pd.DataFrame:
         """
         Search Arxiv Documents in Weaviate with BM25.
         Keyword (also called a sparse vector search) search that looks for objects that contain the search terms in their properties according to 
         the selected tokenization. The results are scored according to the BM25F function. It is .
         """
+        return self.__search(lambda q: q.with_bm25(query=query), None,
+                             max_results, categories, class_name)
 
-        response = (
-            self.weaviate.query
-            .get("ArxivDocument_CS_CL", ["url", "url_pdf", "title", "authors", "categories", "abstract", "update_date", "publication_date"])
-            .with_bm25(query=query)
-            .with_limit(max_results)
-            .with_additional("score")
-            .do()
-        )
-
-        data = response["data"]["Get"]["ArxivDocument_CS_CL"]
-        return pd.DataFrame.from_dict(data, orient='columns')
-
-    @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(3))
-    def query_with_hybrid(self, query, max_results=10) -> pd.DataFrame:
+    @instrument()
+    @coalesce
+    @resilient("weaviate")
+    def query_with_hybrid(self, query, max_results=10, categories=None, class_name=None) -> pd.DataFrame:
         """
         Search Arxiv Documents in Weaviate with BM25.
         Keyword (also called a sparse vector search) search that looks for objects that contain the search terms in their properties according to 
         the selected tokenization. The results are scored according to the BM25F function. It is .
         """
+        return self.__search(lambda q: q.with_hybrid(query=query), None,
+                             max_results, categories, class_name)
 
-        response = (
-            self.weaviate.query
-            .get("ArxivDocument_CS_CL", ["url", "url_pdf", "title", "authors", "categories", "abstract", "update_date", "publication_date"])
-            .with_hybrid(query=query)
-            .with_limit(max_results)
-            .with_additional(["score"])
-            .do()
-        )
+    def __search(self, search, distance: str, max_results: int, categories, class_name: str) -> pd.DataFrame:
+        """
+        Run a search on the category partitions in parallel, and merge their results.
+        Vector distances are comparable across partitions, so vector searches are merged by distance. BM25 and
+        hybrid scores are not (IDF statistics and score fusion are per class), and there is no global statistic
+        to normalize them with: those results are interleaved by their rank within their partition, i.e. the
+        top hit of every partition comes first, whatever the partition size (ties broken by raw score).
+        Cross-listed papers are indexed in several partitions, and only kept once (at their best position).
 
-        data = response["data"]["Get"]["ArxivDocument_CS_CL"]
-        return pd.DataFrame.from_dict(data, orient='columns')
+        Parameters:
+        - search (callable): Adds the search operator to a Get query
+        - distance (str): 'distance' to merge by ascending distance, or None to merge by rank
+        - max_results (int): Number of results
+        - categories (list): Categories to search (default: all CATEGORIES). An empty list raises ValueError
+        - class_name (str): Single class to search, instead of the category partitions
+
+        Returns:
+        - pd.DataFrame: Top results across the partitions (with their distance, or score and rank, in '_additional')
+        """
+        import pandas as pd
+
+        if class_name is None and categories is not None and not categories:
+            raise ValueError("No category to search")
+        partitions = [class_name] if class_name else [class_name_for(c) for c in (categories or CATEGORIES)]
+
+        def query_partition(partition: str) -> list:
+            start = time.perf_counter()
+            query = self.weaviate.query.get(partition, FIELDS).with_limit(max_results) \
+                .with_additional([distance or "score"])
+            response = search(query).do()
+            observe(f"WeaviateStore.partition.{partition}", time.perf_counter() - start)
+            if "errors" in response:
+                raise RuntimeError(f"Weaviate query on '{partition}' failed: {response['errors'][0]['message']}")
+            results = response["data"]["Get"][partition] or []
+            for rank, obj in enumerate(results, start=1):
+                obj["_additional"]["rank"] = rank
+            return results
+
+        if len(partitions) == 1:
+            return pd.DataFrame(query_partition(partitions[0]), columns=FIELDS + ["_additional"])
+
+        results = [obj for objs in self.partitions.map(query_partition, partitions) for obj in objs]
+        if distance:
+            results.sort(key=lambda obj: float(obj["_additional"][distance]))
+        else:
+            # Interleaving, not a score-based merge: rank 1 of every partition, then rank 2, ...
+            results.sort(key=lambda obj: (obj["_additional"]["rank"], -float(obj["_additional"]["score"])))
+
+        unique, seen = [], set()
+        for obj in results:
+            if obj["url"] not in seen:
+                seen.add(obj["url"])
+                unique.append(obj)
+        return pd.DataFrame(unique[:max_results], columns=FIELDS + ["_additional"])
 
     def __load_environment_vars(self):
         """
@@ -122,9 +184,14 @@ class WeaviateStore:
         - weaviate_api_key (str): Weaviate API key
         """
         logging.info(f"Initializing Weaviate Client: '{weaviate_url}'")
+        import weaviate
+
+        # One pooled connection per partition query that may run concurrently
         client = weaviate.Client(
             url=weaviate_url,
             auth_client_secret=weaviate.AuthApiKey(api_key=weaviate_api_key),
-            additional_headers={"X-Cohere-Api-Key": cohere_api_key})
+            additional_headers={"X-Cohere-Api-Key": cohere_api_key},
+            additional_config=weaviate.Config(connection_config=weaviate.ConnectionConfig(
+                session_pool_connections=PARTITION_WORKERS, session_pool_maxsize=PARTITION_WORKERS)))
 
         return client